@@ -1,65 +1,127 @@
+import asyncio
 import logging
 import colorlog
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from routes import router
+from modules.daily_stock_scheduler_agent import DailyStockSchedulerAgent
 
 
 # Configure logging
 logger = logging.getLogger("api")
 logger.setLevel(logging.INFO)
+logger.propagate = False
 
-formatter = colorlog.ColoredFormatter(
-    "%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - "
-    "%(module)s - %(funcName)s - \033[37m%(lineno)d%(reset)s: "
-    "%(message_log_color)s%(message)s%(reset)s",
-    log_colors={
-        "DEBUG": "cyan",
-        "INFO": "green",
-        "WARNING": "yellow",
-        "ERROR": "red",
-        "CRITICAL": "bold_red",
-    },
-    secondary_log_colors={
-        "message": {
+# Build the handler only once (module is re-imported per worker and on reloads)
+if not logger.handlers:
+    formatter = colorlog.ColoredFormatter(
+        "%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - "
+        "%(module)s - %(funcName)s - \033[37m%(lineno)d%(reset)s: "
+        "%(message_log_color)s%(message)s%(reset)s",
+        log_colors={
             "DEBUG": "cyan",
-            "INFO": "light_green",
-            "WARNING": "light_yellow",
-            "ERROR": "light_red",
+            "INFO": "green",
+            "WARNING": "yellow",
+            "ERROR": "red",
             "CRITICAL": "bold_red",
         },
-    },
-)
-
+        secondary_log_colors={
+            "message": {
+                "DEBUG": "cyan",
+                "INFO": "light_green",
+                "WARNING": "light_yellow",
+                "ERROR": "light_red",
+                "CRITICAL": "bold_red",
+            },
+        },
+    )
 
-if not logger.hasHandlers():
     handler = logging.StreamHandler()
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
-# Initialize FastAPI
-api = FastAPI(
-    title="SocksAI API",
-    description="API for stock sentiment analysis and scheduling",
-    version="1.0.0",
-)
-
-# Enable CORS
-api.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=[
-        "GET",
-        "POST",
-    ],
-    allow_headers=["*"],
-)
-
-api.include_router(router)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the Scheduler Agent on startup and release it on shutdown.
+
+    Args:
+        app (FastAPI): The application, whose state holds the Scheduler Agent.
+    """
+    app.state.scheduler = await asyncio.to_thread(DailyStockSchedulerAgent)
+    logger.info("Scheduler Agent created.")
+    yield
+    await asyncio.to_thread(app.state.scheduler.shutdown)
+
+
+async def handle_unexpected_error(request: Request, call_next) -> Response:
+    """
+    Log an unexpected error once and reply with a 500 in the same shape as the routes' errors.
+
+    The error is caught here instead of by an exception handler for `Exception`, which
+    Starlette re-raises after replying, so the server would log its traceback again.
+
+    Args:
+        request (Request): The incoming request.
+        call_next: The next handler of the request.
+
+    Returns:
+        Response: The response of the route, or the 500 error response.
+    """
+    try:
+        return await call_next(request)
+    except Exception as e:
+        logger.error("Unexpected error on %s %s: %s", request.method, request.url.path, e)
+        return ORJSONResponse(
+            status_code=500, content={"detail": {"success": False, "error": str(e)}}
+        )
+
+
+def create_app() -> FastAPI:
+    """
+    Create and configure the SocksAI FastAPI application.
+
+    Returns:
+        FastAPI: The configured FastAPI application.
+    """
+    # Initialize FastAPI
+    app = FastAPI(
+        title="SocksAI API",
+        description="API for stock sentiment analysis and scheduling",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+
+    # Reply to unexpected errors (added first, so CORS also wraps its replies)
+    app.middleware("http")(handle_unexpected_error)
+
+    # Enable CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=[
+            "GET",
+            "POST",
+        ],
+        allow_headers=["*"],
+    )
+
+    app.include_router(router)
+
+    return app
+
+
+api = create_app()
 
 logger.info("API loaded successfully.")
 
-# uvicorn api:api --reload
\ No newline at end of file
+# uvicorn api:api --reload
+# uvicorn api:create_app --factory --reload
+# uvicorn api:api --loop uvloop --http httptools --workers 1
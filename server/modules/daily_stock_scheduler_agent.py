@@ -1,13 +1,26 @@
 import os
+import json
+import time
+import hashlib
+import random
+import asyncio
 import logging
 import holidays
+import threading
+import functools
 import datetime as dt
-from typing import Optional, Dict, Any
-
-from pymongo import MongoClient
+from zoneinfo import ZoneInfo
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Union, List, Tuple, Callable, TypedDict
+
+from pymongo import MongoClient, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError
+from pymongo.collection import Collection
+from pymongo.write_concern import WriteConcern
 from google.api_core.exceptions import ResourceExhausted
 
-from phi.agent import Agent
+from phi.agent import Agent, RunResponse
 from phi.model.google import Gemini
 from phi.tools.googlesearch import GoogleSearch
 from phi.tools.yfinance import YFinanceTools
@@ -15,6 +28,7 @@ from phi.tools.email import EmailTools
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.combining import OrTrigger
 from apscheduler.schedulers.base import BaseScheduler
 
 from .models.models import NewsModel, StockModel, DailyStockAnalysisModel
@@ -22,6 +36,209 @@ from .models.models import NewsModel, StockModel, DailyStockAnalysisModel
 # Configure logger
 logger = logging.getLogger("api")
 
+# Agent runs allowed per minute against the Gemini API
+GEMINI_RPM = int(os.environ.get("GEMINI_RPM", 10))
+
+# Retries for an agent run rejected with ResourceExhausted
+AGENT_MAX_RETRIES = 3
+AGENT_RETRY_BASE_DELAY = 2.0
+
+# Agent runs allowed in flight at once across all jobs
+AGENT_CONCURRENCY = int(os.environ.get("AGENT_CONCURRENCY", 8))
+
+# Seconds a job may start late before the run is skipped
+JOB_MISFIRE_GRACE_TIME = 60
+
+# Number of (stock, date) analysis hashes remembered to skip unchanged writes
+ANALYSIS_HASH_CACHE_SIZE = 1024
+
+# Timezone of the Indian stock market, used for the job schedule and trading days
+MARKET_TIMEZONE = "Asia/Kolkata"
+
+# Per-stock prompt templates for the agents
+STOCK_PROMPT = "Retrieve the latest financial data for the stock ticker {stock}."
+NEWS_PROMPT = "Retrieve the latest news articles for {stock}."
+ANALYSIS_PROMPT = "Perform analysis for stock {stock} with financial data {financial_data} and news data {news_data}."
+ANALYSIS_FETCH_PROMPT = "Retrieve the latest financial data and news for stock {stock} and perform analysis."
+
+# Instructions for the agents
+NEWS_AGENT_INSTRUCTIONS = (
+    "Retrieve the latest news articles related to the provided stock, its sector, and any global events that might impact the stock or stock market.",
+    "Follow these instructions:",
+    "### **Scope of News Search**:",
+    "1. **Stock-Specific News**:",
+    "- Find news articles directly related to the provided stock",
+    "2. **Sector News**:",
+    "- Search for news relevant to the sector or industry the stock belongs to.",
+    "3. **Global or Market-Wide News**:",
+    "- Include any significant global or market-wide events that might impact the stock market as a whole or the specific stock.",
+    "### **Additional Notes**:",
+    "- Ensure all numerical data is within appropriate ranges.",
+    "- Filter out duplicate or irrelevant articles.",
+    "- Focus on credible and up-to-date sources.",
+    "### **Output Requirements**:",
+    "- `symbol`: The stock ticker symbol (string).",
+    "- `news`: A list of news articles (List[News]).",
+    "- `News.title`: The title of the article (string).",
+    "- `News.summary`: A brief summary of the article (string).",
+    "- `News.sentiment_score`: Assign a sentiment score to each article on a scale of 1 (very negative) to 10 (very positive) (integer).",
+    "- `News.impact_score`: Evaluate the potential impact of each article on the stock. Use a scale of 1 (low impact) to 10 (high impact) (integer).",
+    "- `News.source`: Include the source link of the article. (string).",
+    "- `News.publication_date`: Include the publication date of the article (string) [YYYY-MM-DD].",
+    "Ensure the output strictly adheres to the provided schema.",
+)
+
+STOCK_AGENT_INSTRUCTIONS = (
+    "Retrieve the latest financial data for the provided stock.",
+    "Focus on real-time, short-term metrics that are critical for immediate analysis.",
+    "Follow these instructions:",
+    "1. **Current Stock Price**: Provide the current price of the stock with currency.",
+    "2. **Analyst Recommendations**: Provide the latest analyst recommendations and price targets.",
+    "3. **Current Stock Performance**: Fetch the latest stock price, percentage change, and volume.\
+                        Include key metrics like open, high, low, and close prices for the current trading session.",
+    "**Output Requirements**:",
+    "- `symbol`: The stock ticker symbol (string).",
+    "- `price`: An object with `currency` (string) and `price` (float) fields.",
+    "- `analyst_insights`: Latest analyst recommendations and price targets (string).",
+    "- `performance`: A summary of key stock performance metrics (e.g., price, volume, percentage change) (string).",
+    "Ensure the output strictly adheres to the provided schema.",
+)
+
+ANALYST_AGENT_INSTRUCTIONS = (
+    "Perform a detailed sentiment analysis for the provided stock based on the provided financial data and news articles from today.",
+    "If no financial data or news articles are provided, retrieve the latest financial data using YFinance and search the latest news using Google Search first.",
+    "Follow these instructions:",
+    "1. **Financial Data Analysis**:",
+    "- Analyze the provided stock data, including price trends, volume, and any other key metrics.",
+    "- Highlight any significant changes or patterns observed during the day.",
+    "- Summarize the overall market sentiment for the stock based on the financial data (e.g., bullish, bearish, or neutral).",
+    "2. **News Sentiment Analysis**:",
+    "- Review the news articles for provided stock.",
+    "- Extract the key points and assess the sentiment (positive, neutral, or negative).",
+    "- Understand and patterns in the articles to determine overall sentiment.",
+    "3. **Overall Sentiment**:",
+    "- Combine insights from the financial data and news sentiment analysis.",
+    "- Assign a final sentiment score for the stock on a scale of 1 to 10, with justification.",
+    "- Provide a brief summary which will be like a sentiment statement for the stock for the day.",
+    "**Output Requirements**:",
+    "- `symbol`: The stock ticker symbol (string).",
+    "- `closing_price`: The closing price of the stock as an object with `currency` (string) and `price` (float) fields.",
+    "- `analyst_insights`: Latest analyst recommendations and price targets (string).",
+    "- `performance`: A summary of key stock performance metrics (e.g., price, volume, percentage change) (string).",
+    "- `sentiment_score`: Sentiment score (1-10) (integer).",
+    "- `sentiment_statement`: Overall summary for the stock for the day as a sentiment analysis (string).",
+    "Ensure the output strictly adheres to the provided schema.",
+)
+
+EMAIL_AGENT_INSTRUCTIONS = (
+    "Send the provided report to the user via email.",
+    "Subject: SocksAI Daily Stock Report",
+)
+
+
+class SchedulerError(Exception):
+    """
+    Raised when the scheduler cannot be started or stopped.
+    """
+
+
+class SchedulerStatus(TypedDict, total=False):
+    """
+    The status of the scheduler returned by `get_scheduler_status`.
+
+    Attributes:
+        State (int): The scheduler state, 0 (stopped), 1 (running) or 2 (paused).
+        Jobs (Dict[str, str]): A mapping of job names to their next run time, only while running.
+    """
+
+    State: int
+    Jobs: Dict[str, str]
+
+
+def trading_day_job(func: Callable) -> Callable:
+    """
+    Decorate a scheduled job so it only runs when there are stocks to process
+    and today is a trading day, pausing or resuming the scheduler accordingly.
+
+    Args:
+        func (Callable): The job method of DailyStockSchedulerAgent.
+
+    Returns:
+        Callable: The guarded job method.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self.can_run_job(func.__name__):
+            return None
+        return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket limiting the number of calls per time period.
+
+    The rate is halved whenever the provider rejects a call and grows back by one
+    call per period after every successful call (AIMD), so the limiter settles
+    just below the provider's actual limit.
+
+    Attributes:
+        max_rate (float): The maximum number of calls per time period.
+        rate (float): The current number of calls allowed per time period.
+        time_period (float): The time period in seconds.
+    """
+
+    def __init__(self, max_rate: float, time_period: float = 60):
+        """
+        Initialize the RateLimiter with a full bucket.
+
+        Args:
+            max_rate (float): The maximum number of calls per time period.
+            time_period (float): The time period in seconds.
+        """
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.time_period = time_period
+        self._tokens = float(max_rate)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a call is allowed by the limiter.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate,
+                    self._tokens
+                    + (now - self._updated_at) * self.rate / self.time_period,
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.time_period / self.rate
+            time.sleep(wait)
+
+    def decrease(self) -> None:
+        """
+        Halve the rate after the provider rejected a call.
+        """
+        with self._lock:
+            self.rate = max(1, self.rate / 2)
+            self._tokens = min(self._tokens, self.rate)
+
+    def increase(self) -> None:
+        """
+        Grow the rate by one call after a successful call.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 1)
+
 
 class DailyStockSchedulerAgent:
     """
@@ -30,8 +247,16 @@ class DailyStockSchedulerAgent:
     Attributes:
         client (MongoClient): MongoDB client instance.
         db: MongoDB database instance.
+        stock_data_collection (Collection): Collection storing the periodic stock data.
+        stock_news_collection (Collection): Collection storing the hourly stock news.
+        daily_sentiment_collection (Collection): Collection storing the end-of-day analysis.
         scheduler (BackgroundScheduler): Scheduler for automating tasks.
         indian_holidays (holidays.India): List of Indian holidays.
+        trading_day_cache (Tuple[Optional[dt.date], bool]): The last checked day and whether it is a trading day.
+        today_cache (Tuple[Optional[int], str]): The current UTC day number and its "YYYY-MM-DD" date string.
+        gemini_limiter (RateLimiter): Rate limiter for the agent runs against Gemini.
+        agent_executor (ThreadPoolExecutor): Worker threads shared by the agent runs of all jobs.
+        analysis_hashes (OrderedDict[Tuple[str, str], bytes]): LRU of the last stored analysis hash per (stock, date).
         stocks (List[str]): List of stock symbols to analyze.
         news_agent (Agent): Agent for fetching and analyzing news articles.
         stock_agent (Agent): Agent for fetching financial data.
@@ -39,6 +264,46 @@ class DailyStockSchedulerAgent:
         email_agent (Agent): Agent for emailing the Daily analysis report.
     """
 
+    # Display names and ids of the scheduled jobs
+    JOB_IDS = (
+        ("Fetch Stock Data", "fetch_stock_data"),
+        ("Fetch Stock News", "fetch_stock_news"),
+        ("Perform End-of-Day Analysis", "perform_end_of_day_analysis"),
+    )
+
+    # Job triggers in market time, shared by every (re)scheduling of the jobs
+    # Fetch stock data every 5 minutes during NSE trading hours (9:15 to 15:30)
+    STOCK_DATA_TRIGGER = OrTrigger(
+        [
+            CronTrigger(
+                day_of_week="mon-fri",
+                hour="9",
+                minute="15-55/5",
+                timezone=MARKET_TIMEZONE,
+            ),
+            CronTrigger(
+                day_of_week="mon-fri",
+                hour="10-14",
+                minute="*/5",
+                timezone=MARKET_TIMEZONE,
+            ),
+            CronTrigger(
+                day_of_week="mon-fri",
+                hour="15",
+                minute="0-30/5",
+                timezone=MARKET_TIMEZONE,
+            ),
+        ]
+    )
+    # Fetch stock news at the start of every hour within trading hours (10:00 to 15:00)
+    STOCK_NEWS_TRIGGER = CronTrigger(
+        day_of_week="mon-fri", hour="10-15", minute="0", timezone=MARKET_TIMEZONE
+    )
+    # Perform end-of-day analysis at 16:00 (4:00 PM) after market close
+    END_OF_DAY_TRIGGER = CronTrigger(
+        day_of_week="mon-fri", hour="16", minute="0", timezone=MARKET_TIMEZONE
+    )
+
     def __init__(self):
         """
         Initialize the DailyStockSentimentAgent with database and agents.
@@ -52,9 +317,22 @@ class DailyStockSchedulerAgent:
 
         # MongoDB setup
         try:
-            self.client = MongoClient(os.environ.get("MONGO_URI"))
+            self.client = MongoClient(
+                os.environ.get("MONGO_URI"), minPoolSize=2, retryWrites=True
+            )
             self.db = self.client["socksai-daily-stocks-db"]
+            # Periodic writes only need the primary's acknowledgement
+            self.stock_data_collection = self.db.get_collection(
+                "stock-data", write_concern=WriteConcern(w=1)
+            )
+            self.stock_news_collection = self.db.get_collection(
+                "stock-news", write_concern=WriteConcern(w=1)
+            )
+            self.daily_sentiment_collection = self.db.get_collection("daily_sentiment")
             logger.info("MongoDB connected.")
+
+            # MongoDB indexes, once the collection handles are bound
+            self.create_indexes()
         except Exception as e:
             logger.error(f"Error connecting to MongoDB: {e}")
 
@@ -62,10 +340,23 @@ class DailyStockSchedulerAgent:
         try:
             self.scheduler = BackgroundScheduler()
             self.indian_holidays = holidays.India()
+            self.trading_day_cache: Tuple[Optional[dt.date], bool] = (None, False)
+            self.today_cache: Tuple[Optional[int], str] = (None, "")
             logger.info("APScheduler connected.")
         except Exception as e:
             logger.error(f"Error connecting to APScheduler: {e}")
 
+        # Rate limiter setup
+        self.gemini_limiter = RateLimiter(GEMINI_RPM)
+
+        # Agent workers, kept alive across ticks
+        self.agent_executor = ThreadPoolExecutor(
+            max_workers=AGENT_CONCURRENCY, thread_name_prefix="agent"
+        )
+
+        # Hashes of the stored end-of-day analyses
+        self.analysis_hashes: OrderedDict[Tuple[str, str], bytes] = OrderedDict()
+
         # Stocks
         try:
             self.stocks = []
@@ -83,31 +374,7 @@ class DailyStockSchedulerAgent:
                 response_model=NewsModel,
                 model=self.model,
                 tools=[GoogleSearch()],
-                instructions=[
-                    "Retrieve the latest news articles related to the provided stock, its sector, and any global events that might impact the stock or stock market.",
-                    "Follow these instructions:",
-                    "### **Scope of News Search**:",
-                    "1. **Stock-Specific News**:",
-                    "- Find news articles directly related to the provided stock",
-                    "2. **Sector News**:",
-                    "- Search for news relevant to the sector or industry the stock belongs to.",
-                    "3. **Global or Market-Wide News**:",
-                    "- Include any significant global or market-wide events that might impact the stock market as a whole or the specific stock.",
-                    "### **Additional Notes**:",
-                    "- Ensure all numerical data is within appropriate ranges.",
-                    "- Filter out duplicate or irrelevant articles.",
-                    "- Focus on credible and up-to-date sources.",
-                    "### **Output Requirements**:",
-                    "- `symbol`: The stock ticker symbol (string).",
-                    "- `news`: A list of news articles (List[News]).",
-                    "- `News.title`: The title of the article (string).",
-                    "- `News.summary`: A brief summary of the article (string).",
-                    "- `News.sentiment_score`: Assign a sentiment score to each article on a scale of 1 (very negative) to 10 (very positive) (integer).",
-                    "- `News.impact_score`: Evaluate the potential impact of each article on the stock. Use a scale of 1 (low impact) to 10 (high impact) (integer).",
-                    "- `News.source`: Include the source link of the article. (string).",
-                    "- `News.publication_date`: Include the publication date of the article (string) [YYYY-MM-DD].",
-                    "Ensure the output strictly adheres to the provided schema.",
-                ],
+                instructions=list(NEWS_AGENT_INSTRUCTIONS),
                 markdown=False,
                 structured_outputs=True,
             )
@@ -126,21 +393,7 @@ class DailyStockSchedulerAgent:
                         company_info=True,
                     )
                 ],
-                instructions=[
-                    "Retrieve the latest financial data for the provided stock.",
-                    "Focus on real-time, short-term metrics that are critical for immediate analysis.",
-                    "Follow these instructions:",
-                    "1. **Current Stock Price**: Provide the current price of the stock with currency.",
-                    "2. **Analyst Recommendations**: Provide the latest analyst recommendations and price targets.",
-                    "3. **Current Stock Performance**: Fetch the latest stock price, percentage change, and volume.\
-                        Include key metrics like open, high, low, and close prices for the current trading session.",
-                    "**Output Requirements**:",
-                    "- `symbol`: The stock ticker symbol (string).",
-                    "- `price`: An object with `currency` (string) and `price` (float) fields.",
-                    "- `analyst_insights`: Latest analyst recommendations and price targets (string).",
-                    "- `performance`: A summary of key stock performance metrics (e.g., price, volume, percentage change) (string).",
-                    "Ensure the output strictly adheres to the provided schema.",
-                ],
+                instructions=list(STOCK_AGENT_INSTRUCTIONS),
                 markdown=False,
                 structured_outputs=True,
             )
@@ -152,30 +405,15 @@ class DailyStockSchedulerAgent:
                 description="This Agent will analyze the provided financial data along with the news about the stock and give a proper sentiment statement for the stock.",
                 response_model=DailyStockAnalysisModel,
                 model=self.model,
-                instructions=[
-                    "Perform a detailed sentiment analysis for the provided stock based on the provided financial data and news articles from today.",
-                    "Follow these instructions:",
-                    "1. **Financial Data Analysis**:",
-                    "- Analyze the provided stock data, including price trends, volume, and any other key metrics.",
-                    "- Highlight any significant changes or patterns observed during the day.",
-                    "- Summarize the overall market sentiment for the stock based on the financial data (e.g., bullish, bearish, or neutral).",
-                    "2. **News Sentiment Analysis**:",
-                    "- Review the news articles for provided stock.",
-                    "- Extract the key points and assess the sentiment (positive, neutral, or negative).",
-                    "- Understand and patterns in the articles to determine overall sentiment.",
-                    "3. **Overall Sentiment**:",
-                    "- Combine insights from the financial data and news sentiment analysis.",
-                    "- Assign a final sentiment score for the stock on a scale of 1 to 10, with justification.",
-                    "- Provide a brief summary which will be like a sentiment statement for the stock for the day.",
-                    "**Output Requirements**:",
-                    "- `symbol`: The stock ticker symbol (string).",
-                    "- `closing_price`: The closing price of the stock as an object with `currency` (string) and `price` (float) fields.",
-                    "- `analyst_insights`: Latest analyst recommendations and price targets (string).",
-                    "- `performance`: A summary of key stock performance metrics (e.g., price, volume, percentage change) (string).",
-                    "- `sentiment_score`: Sentiment score (1-10) (integer).",
-                    "- `sentiment_statement`: Overall summary for the stock for the day as a sentiment analysis (string).",
-                    "Ensure the output strictly adheres to the provided schema.",
+                tools=[
+                    YFinanceTools(
+                        stock_price=True,
+                        analyst_recommendations=True,
+                        company_info=True,
+                    ),
+                    GoogleSearch(),
                 ],
+                instructions=list(ANALYST_AGENT_INSTRUCTIONS),
                 markdown=False,
                 structured_outputs=True,
             )
@@ -194,15 +432,31 @@ class DailyStockSchedulerAgent:
                         sender_passkey=os.environ.get("EMAIL_PASSKEY"),
                     )
                 ],
-                instructions=[
-                    "Send the provided report to the user via email.",
-                    "Subject: SocksAI Daily Stock Report",
-                ],
+                instructions=list(EMAIL_AGENT_INSTRUCTIONS),
                 markdown=False,
             )
         except Exception as e:
             logger.error(f"Error while Setting up Agents: {e}")
 
+    def create_indexes(self) -> None:
+        """
+        Create the (stock_symbol, date) index used by the upserts and lookups of
+        the stock data, stock news and daily sentiment collections.
+        """
+        # Each collection gets its own attempt, so one failure does not skip the others
+        for collection in (
+            self.stock_data_collection,
+            self.stock_news_collection,
+            self.daily_sentiment_collection,
+        ):
+            try:
+                collection.create_index(
+                    [("stock_symbol", ASCENDING), ("date", ASCENDING)], unique=True
+                )
+                logger.info(f"MongoDB index created for '{collection.name}'.")
+            except Exception as e:
+                logger.error(f"Error creating MongoDB index for '{collection.name}': {e}")
+
     def is_daily_stocks_empty(self, func: str = "process") -> bool:
         if not self.stocks:
             logger.info(f"No stocks to process. Skipping {func}.")
@@ -210,15 +464,57 @@ class DailyStockSchedulerAgent:
         else:
             return False
 
+    def can_run_job(self, func: str) -> bool:
+        """
+        Check if a scheduled job should run, pausing the scheduler on non-trading days.
+
+        Args:
+            func (str): The name of the job, used for logging.
+
+        Returns:
+            bool: True if there are stocks to process and today is a trading day.
+        """
+        if self.is_daily_stocks_empty(func):
+            return False
+
+        if not self.is_trading_day():
+            logger.info(f"Today is not a trading day. Skipping {func}.")
+            self.pause_scheduler()
+            return False
+
+        self.resume_scheduler()
+        return True
+
     def is_trading_day(self) -> bool:
         """
-        Check if today is a trading day.
+        Check if today, in market time, is a trading day.
+
+        The result is cached for the day, as every scheduled job checks it.
 
         Returns:
             bool: True if today is a trading day, False otherwise.
         """
-        today = dt.date.today()
-        return today.weekday() < 5 and today not in self.indian_holidays
+        today = dt.datetime.now(ZoneInfo(MARKET_TIMEZONE)).date()
+        cached_day, is_trading = self.trading_day_cache
+        if cached_day != today:
+            is_trading = today.weekday() < 5 and today not in self.indian_holidays
+            self.trading_day_cache = (today, is_trading)
+        return is_trading
+
+    def get_today(self) -> str:
+        """
+        Get today's UTC date, as stored in the `date` field of the collections.
+
+        The date string is only rebuilt when the UTC day changes. It is kept as a
+        string rather than a BSON date so that it matches the existing documents.
+
+        Returns:
+            str: Today's UTC date in YYYY-MM-DD format.
+        """
+        day = int(time.time() // 86400)
+        if self.today_cache[0] != day:
+            self.today_cache = (day, dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%d"))
+        return self.today_cache[1]
 
     def load_stocks(self):
         """
@@ -244,115 +540,207 @@ class DailyStockSchedulerAgent:
         """
         self.load_stocks()
 
-    def fetch_stock_data(self):
+    def run_agent(self, agent: Agent, prompt: str) -> RunResponse:
         """
-        Fetch and store financial data for all tracked stocks.
+        Run the agent with the prompt on a copy of the agent.
+
+        phi Agents keep per-run state, so concurrent runs must not share an instance.
+        Runs are throttled by the Gemini rate limiter and retried with exponential
+        backoff and jitter when the API reports ResourceExhausted.
+
+        Args:
+            agent (Agent): The agent to run.
+            prompt (str): The prompt for the agent.
+
+        Returns:
+            RunResponse: The response of the agent.
+
+        Raises:
+            ResourceExhausted: If the API still rejects the run after all retries.
+        """
+        for attempt in range(AGENT_MAX_RETRIES + 1):
+            self.gemini_limiter.acquire()
+            try:
+                response = agent.deep_copy().run(prompt)
+                self.gemini_limiter.increase()
+                return response
+            except ResourceExhausted:
+                self.gemini_limiter.decrease()
+                if attempt == AGENT_MAX_RETRIES:
+                    raise
+                delay = random.uniform(0, AGENT_RETRY_BASE_DELAY * 2**attempt)
+                logger.warning(
+                    f"{agent.name} hit ResourceExhausted. Retrying in {delay:.1f}s."
+                )
+                time.sleep(delay)
+
+    async def run_agents(
+        self, agent: Agent, prompts: Dict[str, str]
+    ) -> Dict[str, Union[RunResponse, BaseException]]:
         """
+        Run the agent for all the prompts concurrently on the shared agent
+        executor, which keeps at most AGENT_CONCURRENCY runs in flight.
 
-        if self.is_daily_stocks_empty("fetch_stock_data"):
-            return
+        Args:
+            agent (Agent): The agent to run.
+            prompts (Dict[str, str]): A mapping of stock symbols to their prompts.
 
-        today = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%d")
+        Returns:
+            Dict[str, Union[RunResponse, BaseException]]: A mapping of stock symbols to
+            the agent response, or the exception raised while running the agent.
+        """
+        loop = asyncio.get_running_loop()
+        responses = await asyncio.gather(
+            *[
+                loop.run_in_executor(self.agent_executor, self.run_agent, agent, prompt)
+                for prompt in prompts.values()
+            ],
+            return_exceptions=True,
+        )
+        return dict(zip(prompts.keys(), responses))
+
+    def bulk_write(
+        self, collection: Collection, operations: List[UpdateOne], label: str
+    ) -> bool:
+        """
+        Write all the operations to the collection in a single round trip.
 
-        if self.is_trading_day():
-            logger.info("Today is not a trading day. Skipping stock data fetching.")
-            self.pause_scheduler()
-            return
-        else:
-            self.resume_scheduler()
-            for stock in self.stocks:
-                try:
-                    logger.info(f"Fetching stock data for {stock}...")
-                    data = self.stock_agent.run(
-                        f"Retrieve the latest financial data for the stock ticker {stock}."
-                    )
-                    try:
-                        stock_entry = {
-                            "timestamp": dt.datetime.now(dt.timezone.utc),
-                            "contents": data.content.dict(),
-                        }
+        Args:
+            collection (Collection): The collection to write to.
+            operations (List[UpdateOne]): The update operations to write.
+            label (str): A description of the written data for logging.
 
-                        logger.info(f"Storing data for {stock}...")
+        Returns:
+            bool: True if all the operations were written, False otherwise.
+        """
+        if not operations:
+            logger.info(f"No {label} to store.")
+            return True
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            logger.info(
+                f"Stored {label}: updated {result.matched_count}, created {result.upserted_count} documents."
+            )
+            return True
+        except BulkWriteError as e:
+            logger.error(f"Error storing some of the {label}: {e.details['writeErrors']}")
+        except Exception as e:
+            logger.error(f"Error storing {label}: {e}")
+        return False
 
-                        stock_data = self.db.get_collection("stock-data")
+    def hash_analysis(self, analysis: Dict) -> bytes:
+        """
+        Hash an end-of-day analysis to detect unchanged results.
 
-                        result = stock_data.update_one(
-                            {"stock_symbol": stock, "date": today},
-                            {"$push": {"data": stock_entry}},
-                            upsert=True,
-                        )
+        Args:
+            analysis (Dict): The dumped analysis.
 
-                        if result.matched_count > 0:
-                            logger.info(
-                                f"Updated existing document for {stock} Data on {today}."
-                            )
-                        else:
-                            logger.info(
-                                f"Created new document for {stock} Data on {today}."
-                            )
-                    except Exception as e:
-                        logger.error(f"Error storing stock data for {stock}: {e}")
-                except ResourceExhausted as e:
-                    logger.warning(
-                        f"ResourceExhausted error while fetching stock data for {stock}: {e}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error fetching stock data for {stock}: {e}")
+        Returns:
+            bytes: The digest of the analysis.
+        """
+        payload = json.dumps(analysis, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(payload, digest_size=16).digest()
 
-    def fetch_stock_news(self):
+    def remember_analysis_hashes(self, digests: Dict[Tuple[str, str], bytes]) -> None:
         """
-        Fetch and store news articles for all tracked stocks.
+        Remember the hashes of stored analyses, evicting the least recently stored ones.
+
+        Args:
+            digests (Dict[Tuple[str, str], bytes]): A mapping of (stock, date) to the analysis hash.
         """
+        for key, digest in digests.items():
+            self.analysis_hashes[key] = digest
+            self.analysis_hashes.move_to_end(key)
+        while len(self.analysis_hashes) > ANALYSIS_HASH_CACHE_SIZE:
+            self.analysis_hashes.popitem(last=False)
 
-        if self.is_daily_stocks_empty("fetch_stock_news"):
-            return
+    @trading_day_job
+    def fetch_stock_data(self):
+        """
+        Fetch and store financial data for all tracked stocks.
+        """
 
-        today = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%d")
+        today = self.get_today()
 
-        if not self.is_trading_day():
-            logger.info("Today is not a trading day. Skipping news fetching.")
-            self.pause_scheduler()
-            return
-        else:
-            self.resume_scheduler()
-            for stock in self.stocks:
-                try:
-                    logger.info(f"Fetching news for {stock}...")
-                    news = self.news_agent.run(
-                        f"Retrieve the latest news articles for {stock}."
+        logger.info(f"Fetching stock data for {self.stocks}...")
+        responses = asyncio.run(
+            self.run_agents(
+                self.stock_agent,
+                {stock: STOCK_PROMPT.format(stock=stock) for stock in self.stocks},
+            )
+        )
+        operations = []
+        for stock, data in responses.items():
+            if isinstance(data, ResourceExhausted):
+                logger.warning(
+                    f"ResourceExhausted error while fetching stock data for {stock}: {data}"
+                )
+                continue
+            if isinstance(data, BaseException):
+                logger.error(f"Error fetching stock data for {stock}: {data}")
+                continue
+            try:
+                stock_entry = {
+                    "timestamp": dt.datetime.now(dt.timezone.utc),
+                    "contents": data.content.model_dump(),
+                }
+                operations.append(
+                    UpdateOne(
+                        {"stock_symbol": stock, "date": today},
+                        {"$push": {"data": stock_entry}},
+                        upsert=True,
                     )
-                    try:
-                        news_entry = {
-                            "timestamp": dt.datetime.now(dt.timezone.utc),
-                            "contents": news.content.dict(),
-                        }
+                )
+            except Exception as e:
+                logger.error(f"Error preparing stock data for {stock}: {e}")
 
-                        logger.info(f"Storing news for {stock}...")
+        self.bulk_write(
+            self.stock_data_collection, operations, f"stock data on {today}"
+        )
 
-                        stock_news = self.db.get_collection("stock-news")
+    @trading_day_job
+    def fetch_stock_news(self):
+        """
+        Fetch and store news articles for all tracked stocks.
+        """
 
-                        result = stock_news.update_one(
-                            {"stock_symbol": stock, "date": today},
-                            {"$push": {"data": news_entry}},
-                            upsert=True,
-                        )
+        today = self.get_today()
 
-                        if result.matched_count > 0:
-                            logger.info(
-                                f"Updated existing document for {stock} News on {today}."
-                            )
-                        else:
-                            logger.info(
-                                f"Created new document for {stock} News on {today}."
-                            )
-                    except Exception as e:
-                        logger.error(f"Error storing news for {stock}: {e}")
-                except ResourceExhausted as e:
-                    logger.warning(
-                        f"ResourceExhausted error while fetching news for {stock}: {e}"
+        logger.info(f"Fetching news for {self.stocks}...")
+        responses = asyncio.run(
+            self.run_agents(
+                self.news_agent,
+                {stock: NEWS_PROMPT.format(stock=stock) for stock in self.stocks},
+            )
+        )
+        operations = []
+        for stock, news in responses.items():
+            if isinstance(news, ResourceExhausted):
+                logger.warning(
+                    f"ResourceExhausted error while fetching news for {stock}: {news}"
+                )
+                continue
+            if isinstance(news, BaseException):
+                logger.error(f"Error fetching news for {stock}: {news}")
+                continue
+            try:
+                news_entry = {
+                    "timestamp": dt.datetime.now(dt.timezone.utc),
+                    "contents": news.content.model_dump(),
+                }
+                operations.append(
+                    UpdateOne(
+                        {"stock_symbol": stock, "date": today},
+                        {"$push": {"data": news_entry}},
+                        upsert=True,
                     )
-                except Exception as e:
-                    logger.error(f"Error fetching news for {stock}: {e}")
+                )
+            except Exception as e:
+                logger.error(f"Error preparing news for {stock}: {e}")
+
+        self.bulk_write(
+            self.stock_news_collection, operations, f"stock news on {today}"
+        )
 
     def email_report(self, report: str):
         """
@@ -365,101 +753,124 @@ class DailyStockSchedulerAgent:
         except Exception as e:
             logger.error(f"Error sending email report: {e}")
 
+    @trading_day_job
     def perform_end_of_day_analysis(self) -> None:
         """
         Perform end-of-day analysis for monitored stocks.
         """
 
-        if self.is_daily_stocks_empty("perform_end_of_day_analysis"):
-            return
-
-        today = dt.datetime.now(dt.timezone.utc)
+        today = self.get_today()
 
-        if not self.is_trading_day():
-            logger.info("Today is not a trading day. Skipping end-of-day analysis.")
-            self.pause_scheduler()
+        # Fetch today's financial data and news for all stocks at once
+        try:
+            stock_query = {"stock_symbol": {"$in": self.stocks}, "date": today}
+            stock_docs = {
+                doc["stock_symbol"]: doc
+                for doc in self.stock_data_collection.find(stock_query)
+            }
+            news_docs = {
+                doc["stock_symbol"]: doc
+                for doc in self.stock_news_collection.find(stock_query)
+            }
+        except Exception as e:
+            logger.error(f"Error fetching data for {self.stocks} from MongoDB: {e}")
             return
-        else:
-            self.resume_scheduler()
-            for stock in self.stocks:
-                # Fetch today's financial data and news
-                try:
-                    # Fetch today's financial data document
-                    stock_doc = self.db.stock_data.find_one(
-                        {"stock_symbol": stock, "date": today}
-                    )
-                    if stock_doc:
-                        financial_data = stock_doc.get(
-                            "data", []
-                        )  # Extract stored periodic data
-                    else:
-                        financial_data = []
 
-                    # Fetch today's stock news document
-                    news_doc = self.db.stock_news.find_one(
-                        {"stock_symbol": stock, "date": today}
-                    )
-                    if news_doc:
-                        news_data = news_doc.get(
-                            "data", []
-                        )  # Extract stored news articles
-                    else:
-                        news_data = []
-                except Exception as e:
-                    logger.error(f"Error fetching data for {stock} from MongoDB: {e}")
-                    continue
-
-                # Perform analysis
-                try:
-                    analysis = self.daily_stock_analyst_agent.run(
-                        f"Perform analysis for stock {stock} with financial data {financial_data} and news data {news_data}."
-                    )
+        prompts = {}
+        for stock in self.stocks:
+            # Extract stored periodic data and news articles
+            financial_data = stock_docs.get(stock, {}).get("data", [])
+            news_data = news_docs.get(stock, {}).get("data", [])
 
-                    self.db.daily_sentiment.update_one(
+            if financial_data or news_data:
+                prompts[stock] = ANALYSIS_PROMPT.format(
+                    stock=stock, financial_data=financial_data, news_data=news_data
+                )
+            else:
+                # Nothing stored today, let the analyst fetch the data in the same run
+                prompts[stock] = ANALYSIS_FETCH_PROMPT.format(stock=stock)
+
+        # Perform analysis
+        responses = asyncio.run(
+            self.run_agents(self.daily_stock_analyst_agent, prompts)
+        )
+        operations = []
+        digests = {}
+        for stock, analysis in responses.items():
+            if isinstance(analysis, ResourceExhausted):
+                logger.warning(
+                    f"ResourceExhausted error during end-of-day analysis for {stock}: {analysis}"
+                )
+                continue
+            if isinstance(analysis, BaseException):
+                logger.error(
+                    f"Error during end-of-day analysis for {stock}: {analysis}"
+                )
+                continue
+            try:
+                analysis_data = analysis.content.model_dump()
+                # Skip the write when the same analysis is already stored for today
+                digest = self.hash_analysis(analysis_data)
+                if self.analysis_hashes.get((stock, today)) == digest:
+                    logger.info(f"End-of-day analysis for {stock} is unchanged. Skipping.")
+                    continue
+                digests[(stock, today)] = digest
+                operations.append(
+                    UpdateOne(
                         {"stock_symbol": stock, "date": today},
                         {
                             "$set": {
                                 "stock_symbol": stock,
                                 "date": today,
-                                "analysis": analysis,
+                                "analysis": analysis_data,
                                 "last_updated": dt.datetime.now(dt.timezone.utc),
                             }
                         },
                         upsert=True,
                     )
-                    logger.info(f"End-of-day analysis for {stock} stored successfully.")
-                except ResourceExhausted as e:
-                    logger.warning(
-                        f"ResourceExhausted error during end-of-day analysis for {stock}: {e}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error during end-of-day analysis for {stock}: {e}")
+                )
+            except Exception as e:
+                logger.error(f"Error preparing end-of-day analysis for {stock}: {e}")
+
+        if self.bulk_write(
+            self.daily_sentiment_collection, operations, "end-of-day analysis"
+        ):
+            self.remember_analysis_hashes(digests)
 
     def schedule_jobs(self) -> None:
         """
         Schedule periodic tasks for fetching stock data and news.
+
+        A job never overlaps a still running tick of itself, and runs missed
+        while it was busy are merged into one instead of queueing up.
         """
         try:
-            # Fetch stock data every 5 minutes during trading hours
             self.scheduler.add_job(
                 self.fetch_stock_data,
-                trigger=CronTrigger(day_of_week="mon-fri", hour="9-15", minute="*/5"),
+                trigger=self.STOCK_DATA_TRIGGER,
                 id="fetch_stock_data",
                 replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=JOB_MISFIRE_GRACE_TIME,
             )
-            # Fetch stock news at the start of every hour during trading hours
             self.scheduler.add_job(
                 self.fetch_stock_news,
-                trigger=CronTrigger(day_of_week="mon-fri", hour="9-15", minute="0"),
+                trigger=self.STOCK_NEWS_TRIGGER,
                 id="fetch_stock_news",
                 replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=JOB_MISFIRE_GRACE_TIME,
             )
-            # Perform end-of-day analysis at 16:00 (4:00 PM) after market close
             self.scheduler.add_job(
                 self.perform_end_of_day_analysis,
-                trigger=CronTrigger(day_of_week="mon-fri", hour="16", minute="0"),
+                trigger=self.END_OF_DAY_TRIGGER,
                 id="perform_end_of_day_analysis",
                 replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=JOB_MISFIRE_GRACE_TIME,
             )
             logger.info("Scheduled periodic tasks.")
         except Exception as e:
@@ -468,6 +879,9 @@ class DailyStockSchedulerAgent:
     def start_scheduler(self) -> None:
         """
         Start the scheduler.
+
+        Raises:
+            SchedulerError: If the scheduler fails to start.
         """
         try:
             if not self.scheduler.running:
@@ -478,16 +892,37 @@ class DailyStockSchedulerAgent:
                 logger.info("Scheduler is already running.")
         except Exception as e:
             logger.error(f"Error starting agents and scheduler: {e}")
+            raise SchedulerError(f"Error starting scheduler: {e}") from e
 
     def stop_scheduler(self) -> None:
         """
         Stop the scheduler.
+
+        Raises:
+            SchedulerError: If the scheduler fails to stop.
         """
         try:
-            self.scheduler.shutdown()
-            logger.info("Scheduler stopped.")
+            if self.scheduler.running:
+                self.scheduler.shutdown()
+                logger.info("Scheduler stopped.")
+            else:
+                logger.info("Scheduler is not running. Skipping stop.")
         except Exception as e:
             logger.error(f"Error stopping scheduler: {e}")
+            raise SchedulerError(f"Error stopping scheduler: {e}") from e
+
+    def shutdown(self) -> None:
+        """
+        Stop the scheduler and release the agent workers and MongoDB connections.
+        """
+        try:
+            if self.scheduler.running:
+                self.scheduler.shutdown(wait=False)
+            self.agent_executor.shutdown(wait=False, cancel_futures=True)
+            self.client.close()
+            logger.info("Scheduler Agent shut down.")
+        except Exception as e:
+            logger.error(f"Error shutting down Scheduler Agent: {e}")
 
     def resume_scheduler(self) -> None:
         """
@@ -560,26 +995,20 @@ class DailyStockSchedulerAgent:
         """
         return self.scheduler.state
 
-    def get_scheduler_status(self) -> Optional[Dict[str, Any]]:
+    def get_scheduler_status(self) -> Optional[SchedulerStatus]:
         """
         Retrieves the current status of the scheduler, including its state
         and details of scheduled jobs.
 
         Returns:
-            Optional[Dict[str, Any]]: 
+            Optional[SchedulerStatus]:
                 - If successful, returns a dictionary with:
                     - "State" (int): The current scheduler state.
                     - "Jobs" (Dict[str, str]): A mapping of job names to their next run time or "Job not found".
                 - If an error occurs, returns None.
         """
         try:
-            status = {}
-
-            job_ids = {
-                "Fetch Stock Data": "fetch_stock_data",
-                "Fetch Stock News": "fetch_stock_news",
-                "Perform End-of-Day Analysis": "perform_end_of_day_analysis",
-            }
+            status: SchedulerStatus = {}
 
             scheduler_state = self.get_scheduler_state()
 
@@ -588,7 +1017,7 @@ class DailyStockSchedulerAgent:
             elif scheduler_state == 1:
                 status["State"] = scheduler_state
                 status["Jobs"] = {}
-                for job_name, job_id in job_ids.items():
+                for job_name, job_id in self.JOB_IDS:
                     job = self.scheduler.get_job(job_id)
                     logger.info(job)
                     if job:
@@ -597,9 +1026,8 @@ class DailyStockSchedulerAgent:
                             if job.next_run_time
                             else "Not scheduled"
                         )
-                        
                     else:
-                        status["Jobs"] = {job_name: "Job not found"}
+                        status["Jobs"][job_name] = "Job not found"
 
             return status
         except Exception as e:
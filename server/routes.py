@@ -1,16 +1,19 @@
+import asyncio
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 
-from modules.daily_stock_scheduler_agent import DailyStockSchedulerAgent
+from modules.daily_stock_scheduler_agent import DailyStockSchedulerAgent, SchedulerError
 
 logger = logging.getLogger("api")
 
 # Create a router
 router = APIRouter()
 
-# Initialize the Scheduler Agent
-scheduler_agent = DailyStockSchedulerAgent()
+
+# Get the Scheduler Agent created by the app lifespan
+def get_scheduler_agent(request: Request) -> DailyStockSchedulerAgent:
+    return request.app.state.scheduler
 
 
 @router.get("/", tags=["Home"])
@@ -26,109 +29,153 @@ async def home():
     }
 
 
-@router.post("/start_scheduler", tags=["Scheduler"])
-async def start_schedule():
-    """
-    Start the daily stock sentiment analysis scheduler.
-    """
-    logger.info("Received request to start the scheduler.")
-    try:
-        scheduler_agent.start_scheduler()
-        logger.info("Scheduler started successfully.")
-        return {"success": True, "message": "Scheduler started successfully."}
-    except Exception as e:
-        logger.error(f"Error starting scheduler: {str(e)}")
-        raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
-
-
-@router.post("/stop_scheduler", tags=["Scheduler"])
-async def stop_schedule():
-    """
-    Stop the daily stock sentiment analysis scheduler.
-    """
-    logger.info("Received request to stop the scheduler.")
-    try:
-        scheduler_agent.stop_scheduler()
-        logger.info("Scheduler stopped successfully.")
-        return {"success": True, "message": "Scheduler stopped successfully."}
-    except Exception as e:
-        logger.error(f"Error stopping scheduler: {str(e)}")
-        raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
-
-
-@router.get("/scheduler_status", tags=["Scheduler"])
-async def get_scheduler_status():
-    """
-    Get the current status of the stock sentiment analysis scheduler.
-    """
-    logger.info("Received request to get scheduler status.")
-    try:
-        status = scheduler_agent.get_scheduler_status()
-        logger.info(f"Scheduler Status: {status}")
-        return {"success": True, "status": status}
-    except Exception as e:
-        logger.error(f"Error getting scheduler status: {str(e)}")
-        raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
-
-
-@router.post("/reload_stocks", tags=["Daily Stocks"])
-async def reload_stocks():
-    """
-    Reload the stock list.
-    """
-    logger.info("Received request to reload stocks.")
-    try:
-        scheduler_agent.reload_stocks()
-        logger.info("Stocks reloaded successfully.")
-        return {"success": True, "message": "Stocks reloaded successfully."}
-    except Exception as e:
-        logger.error(f"Error reloading stocks: {str(e)}")
-        raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
+@router.get("/healthz", tags=["Home"])
+async def healthz():
+    """
+    Lightweight liveness check for clients and load balancers.
+    """
+    return {"success": True}
+
+
+# Scheduler routes that call a single agent method:
+# (path, HTTP method, tag, agent method, mode, reply, description)
+#   - "run": run the method and reply with the message
+#   - "queue": reply 202 with the message and run the method in the background
+#   - "read": reply with the result of the method under the reply key
+SCHEDULER_ROUTES = (
+    (
+        "/start_scheduler",
+        "POST",
+        "Scheduler",
+        "start_scheduler",
+        "run",
+        "Scheduler started successfully.",
+        "Start the daily stock sentiment analysis scheduler.",
+    ),
+    (
+        "/stop_scheduler",
+        "POST",
+        "Scheduler",
+        "stop_scheduler",
+        "run",
+        "Scheduler stopped successfully.",
+        "Stop the daily stock sentiment analysis scheduler.",
+    ),
+    (
+        "/scheduler_status",
+        "GET",
+        "Scheduler",
+        "get_scheduler_status",
+        "read",
+        "status",
+        "Get the current status of the stock sentiment analysis scheduler.",
+    ),
+    (
+        "/reload_stocks",
+        "POST",
+        "Daily Stocks",
+        "reload_stocks",
+        "queue",
+        "Stocks reload queued.",
+        "Reload the stock list in the background after responding.",
+    ),
+    (
+        "/refresh_scheduler",
+        "POST",
+        "Scheduler",
+        "refresh_scheduler",
+        "queue",
+        "Scheduler refresh queued.",
+        "Refresh the stock sentiment analysis scheduler in the background after responding.",
+    ),
+    (
+        "/scheduler_state",
+        "GET",
+        "Scheduler",
+        "get_scheduler_state",
+        "read",
+        "state",
+        "Get the current state of the stock sentiment analysis scheduler.",
+    ),
+)
+
+
+def add_scheduler_route(
+    path: str,
+    http_method: str,
+    tag: str,
+    agent_method: str,
+    mode: str,
+    reply: str,
+    description: str,
+) -> None:
+    """
+    Add a route to the router that calls a single Scheduler Agent method.
+
+    Args:
+        path (str): The route path.
+        http_method (str): The HTTP method of the route.
+        tag (str): The OpenAPI tag of the route.
+        agent_method (str): The name of the DailyStockSchedulerAgent method to call.
+        mode (str): "run", "queue" or "read", see SCHEDULER_ROUTES.
+        reply (str): The success message, or the response key for "read" routes.
+        description (str): The OpenAPI description of the route.
+    """
+
+    async def endpoint(
+        background_tasks: BackgroundTasks,
+        scheduler_agent: DailyStockSchedulerAgent = Depends(get_scheduler_agent),
+    ):
+        logger.info("Received request to %s.", agent_method)
+        try:
+            method = getattr(scheduler_agent, agent_method)
+            if mode == "queue":
+                background_tasks.add_task(method)
+                logger.info(reply)
+                return {"success": True, "message": reply}
+
+            result = await asyncio.to_thread(method)
+            if mode == "read":
+                logger.info("%s: %s", agent_method, result)
+                return {"success": True, reply: result}
+
+            logger.info(reply)
+            return {"success": True, "message": reply}
+        except SchedulerError as e:
+            logger.error("Error in %s: %s", agent_method, e)
+            raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
+
+    router.add_api_route(
+        path,
+        endpoint,
+        methods=[http_method],
+        tags=[tag],
+        name=agent_method,
+        description=description,
+        status_code=202 if mode == "queue" else 200,
+    )
+
+
+for route in SCHEDULER_ROUTES:
+    add_scheduler_route(*route)
 
 
 @router.post("/toggle_scheduler", tags=["Scheduler"])
-async def toggle_scheduler():
+async def toggle_scheduler(
+    scheduler_agent: DailyStockSchedulerAgent = Depends(get_scheduler_agent),
+):
     """
     Toggle the stock sentiment analysis scheduler.
     """
     logger.info("Received request to toggle the scheduler.")
     try:
-        status = scheduler_agent.toggle_scheduler()
+        status = await asyncio.to_thread(scheduler_agent.toggle_scheduler)
         if status != "error":
-            logger.info(f"Scheduler toggled to {status} successfully.")
+            logger.info("Scheduler toggled to %s successfully.", status)
             return {"success": True, "message": f"Scheduler toggled to {status} successfully."}
         else:
             logger.error("Error toggling scheduler.")
             raise HTTPException(status_code=500, detail={"success": False, "error": "Error toggling scheduler."})
-    except Exception as e:
-        logger.error(f"Error toggling scheduler: {str(e)}")
+    except SchedulerError as e:
+        logger.error("Error toggling scheduler: %s", e)
         raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
-    
-
-@router.post("/refresh_scheduler", tags=["Scheduler"])
-async def refresh_scheduler():
-    """
-    Refresh the stock sentiment analysis scheduler.
-    """
-    logger.info("Received request to refresh the scheduler.")
-    try:
-        scheduler_agent.refresh_scheduler()
-        logger.info("Scheduler refreshed successfully.")
-        return {"success": True, "message": "Scheduler refreshed successfully."}
-    except Exception as e:
-        logger.error(f"Error refreshing scheduler: {str(e)}")
-        raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
-    
-@router.get("/scheduler_state", tags=["Scheduler"])
-async def get_scheduler_state():
-    """
-    Get the current state of the stock sentiment analysis scheduler.
-    """
-    logger.info("Received request to get scheduler state.")
-    try:
-        state = scheduler_agent.get_scheduler_state()
-        logger.info(f"Scheduler State: {state}")
-        return {"success": True, "state": state}
-    except Exception as e:
-        logger.error(f"Error getting scheduler state: {str(e)}")
-        raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
\ No newline at end of file
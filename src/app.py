@@ -1,26 +1,21 @@
 import os
+import re
+import time
+import httpx
+import hashlib
+import asyncio
 import logging
 import colorlog
-import requests
+import functools
 import datetime as dt
 import streamlit as st
 from dotenv import load_dotenv
 
-from phi.model.google import Gemini
-from phi.embedder.google import GeminiEmbedder
-
-from pymongo import MongoClient
-from pymongo.errors import InvalidURI
-from qdrant_client import QdrantClient
-from qdrant_client.http import exceptions as qdrant_exceptions
-
 from streamlit_components.st_show_toast import show_toast
-from streamlit_components.st_horizontal import st_horizontal
+from streamlit_components.st_horizontal import st_horizontal, st_horizontal_style
 
-from modules.find_stock_agent import FindStockAgent
-from modules.daily_stock_sentiment_agent import DailyStockSentimentAgent
-from modules.stock_chart_agent import StockChartAgent
-from modules.stock_chatbot_agent import StockChatbotAgent
+# The model SDKs, database drivers and agents are imported where they are first
+# needed, so the key setup does not pay for importing them
 
 
 load_dotenv()
@@ -28,33 +23,34 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger("app")
 logger.setLevel(logging.INFO)
-
-formatter = colorlog.ColoredFormatter(
-    "%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - "
-    "%(module)s - %(funcName)s - \033[37m%(lineno)d%(reset)s: "
-    "%(message_log_color)s%(message)s%(reset)s",
-    log_colors={
-        "DEBUG": "cyan",
-        "INFO": "green",
-        "WARNING": "yellow",
-        "ERROR": "red",
-        "CRITICAL": "bold_red",
-    },
-    secondary_log_colors={
-        "message": {
+logger.propagate = False
+
+# Build the handler only once (Streamlit reruns this script on every interaction)
+if not logger.handlers:
+    formatter = colorlog.ColoredFormatter(
+        "%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - "
+        "%(module)s - %(funcName)s - \033[37m%(lineno)d%(reset)s: "
+        "%(message_log_color)s%(message)s%(reset)s",
+        log_colors={
             "DEBUG": "cyan",
-            "INFO": "light_green",
-            "WARNING": "light_yellow",
-            "ERROR": "light_red",
+            "INFO": "green",
+            "WARNING": "yellow",
+            "ERROR": "red",
             "CRITICAL": "bold_red",
         },
-    },
-)
-
-handler = logging.StreamHandler()
-handler.setFormatter(formatter)
+        secondary_log_colors={
+            "message": {
+                "DEBUG": "cyan",
+                "INFO": "light_green",
+                "WARNING": "light_yellow",
+                "ERROR": "light_red",
+                "CRITICAL": "bold_red",
+            },
+        },
+    )
 
-if not logger.hasHandlers():
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
     logger.addHandler(handler)
 
 
@@ -66,82 +62,128 @@ ENVIRONMENT_KEYS = {
     "server_url": "SERVER_URL",
 }
 
+# Seconds a successful key validation is reused for
+VALIDATION_TTL = 300
+
+# Formats a key must match before it is validated over the network
+GEMINI_API_KEY_PATTERN = re.compile(r"^AIza[0-9A-Za-z_-]{35}$")
+MONGODB_URL_PATTERN = re.compile(r"^mongodb(\+srv)?://")
+QDRANT_URL_PATTERN = re.compile(r"^https?://")
+
+# App pages (script, title)
+PAGES = (
+    ("socks_home.py", "Home"),
+    ("socks_chatbot.py", "SocksAI Chatbot"),
+    ("socks_chart.py", "Socks Chart"),
+    ("daily_socks.py", "Daily Socks"),
+)
+
+# Session state defaults, built by these factories when missing
+SESSION_DEFAULTS = {
+    # Agent Data
+    "chatbot_interactions": list,
+    # Helper Data
+    "found_stocks": list,
+    "added_stocks": list,
+    "scheduler_state": int,
+}
+
+# Session state agents
+AGENT_KEYS = {"fsa", "dssa", "sca", "scba"}
+
+# Custom Styling
+CUSTOM_CSS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "assets", "custom.css"
+)
+
 # App logo
 st.logo("assests/socksai.png")
 
 # App pages
-pages = [
-    st.Page("socks_home.py", title="Home"),
-    st.Page("socks_chatbot.py", title="SocksAI Chatbot"),
-    st.Page("socks_chart.py", title="Socks Chart"),
-    st.Page("daily_socks.py", title="Daily Socks"),
-]
-
-pg = st.navigation(pages)
+pg = st.navigation([st.Page(page, title=title) for page, title in PAGES])
 pg.run()
 
+# Function to read the custom styling once per process
+@st.cache_resource(show_spinner=False)
+def get_custom_css() -> str:
+    with open(CUSTOM_CSS_PATH, encoding="utf-8") as css_file:
+        return f"<style>{css_file.read()}</style>"
+
+
 # Custom Styling
-st.markdown(
-    """
-    <style>
-        /* Remove blank space at top and bottom */
-        .block-container {
-            padding-top: 2rem;
-            padding-bottom: 2rem;
-        }
-
-        .st-emotion-cache-janbn0 {
-            flex-direction: row-reverse;
-            text-align: right;
-        }
-
-        .st-emotion-cache-1dnm2d2 .es2srfl5 {
-            display: none;
-        }
-
-        div[data-testid="stDialog"] div[role="dialog"]:has(.big-dialog) {
-            width: 80vw;
-            /* height: 80vh; */
-        }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+st.markdown(get_custom_css(), unsafe_allow_html=True)
+st_horizontal_style()
 
-# Initialize keys session state
-for key, env_var in ENVIRONMENT_KEYS.items():
-    try:
-        if key not in st.session_state:
-            st.session_state[key] = os.environ.get(env_var, "")
-            environment_session_key = st.session_state[key]
-            logger.info(
-                f"Initializing Environment Key[{key}]: {' ' if environment_session_key == '' else ('...' + '***' + environment_session_key[-4:])}"
-            )
-    except KeyError:
-        logger.critical(
-            "File `.env` or variable `ENVIRONMENT_KEYS` was altered Environment Key mapping maynot work properly"
-        )
-    except Exception as e:
-        logger.error(f"Error while initializing Keys: {e}")
+# Function to read the environment keys once per process
+@st.cache_resource(show_spinner=False)
+def get_environment_snapshot():
+    return {
+        key: os.environ.get(env_var, "") for key, env_var in ENVIRONMENT_KEYS.items()
+    }
 
 
 # Function to mask API keys for logging
 def mask_key(key, visible_chars=4):
     if not key:
         return "None"
-    masked_key = str("..." + "***" + key[-visible_chars:])
-    return masked_key
+    # Fixed size output, however long the key or URI is
+    return f"...***{key[-visible_chars:]}"
+
+
+# Initialize keys session state once per session
+if not st.session_state.get("environment_initialized", False):
+    try:
+        for key, environment_session_key in get_environment_snapshot().items():
+            if key not in st.session_state:
+                st.session_state[key] = environment_session_key
+                logger.info(
+                    f"Initializing Environment Key[{key}]: {mask_key(environment_session_key)}"
+                )
+        st.session_state.environment_initialized = True
+    except Exception as e:
+        logger.error(f"Error while initializing Keys: {e}")
+
+
+# Function to reuse successful validations of the same keys within the session
+def cache_validation(validator):
+    @functools.wraps(validator)
+    async def cached_validator(*credentials):
+        cache = st.session_state.setdefault("validation_cache", {})
+        # Fingerprint the credentials, so the cache holds no copy of the secrets
+        cache_key = hashlib.blake2b(
+            repr((validator.__name__, credentials)).encode(), digest_size=16
+        ).hexdigest()
+        validated_at = cache.get(cache_key)
+        if validated_at is not None and time.monotonic() - validated_at < VALIDATION_TTL:
+            logger.info(f"Using cached result of {validator.__name__}")
+            return True
+
+        is_valid = await validator(*credentials)
+        # Only successes are cached, so failed keys can be retried right away
+        if is_valid:
+            cache[cache_key] = time.monotonic()
+        return is_valid
+
+    return cached_validator
 
 
 # Function to validate Gemini API Key
-def validate_gemini_api_key(api_key):
+@cache_validation
+async def validate_gemini_api_key(api_key):
     masked_key = mask_key(api_key)
+    if not GEMINI_API_KEY_PATTERN.match(api_key):
+        logger.warning(f"Malformed Gemini API Key: {masked_key}")
+        show_toast("⚠️ Invalid Gemini API Key")
+        return False
+
     api_url = "https://generativelanguage.googleapis.com/v1/models"
 
     headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
 
     try:
-        response = requests.get(api_url, headers=headers)
+        # A client per call, as each asyncio.run() starts a new event loop
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(api_url, headers=headers)
         if response.status_code == 200:
             logger.info(f"Gemini API Key validation successful: {masked_key}")
             show_toast(f"Gemini API Key validation successful: {masked_key}")
@@ -155,12 +197,36 @@ def validate_gemini_api_key(api_key):
         return False
 
 
+# Function to get a MongoDB client, shared across reruns for the same URL
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_mongodb_client(cluster_url):
+    from pymongo import MongoClient
+
+    return MongoClient(cluster_url, serverSelectionTimeoutMS=3000, maxPoolSize=10)
+
+
+# Function to get a Qdrant client, shared across reruns for the same URL and key
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_qdrant_client(qdrant_url, api_key):
+    from qdrant_client import QdrantClient
+
+    return QdrantClient(url=qdrant_url, api_key=api_key, timeout=5)
+
+
 # Function to validate MongoDB URL
-def validate_mongodb_url(cluster_url):
+@cache_validation
+async def validate_mongodb_url(cluster_url):
+    from pymongo.errors import InvalidURI
+
     masked_url = mask_key(cluster_url)
+    if not MONGODB_URL_PATTERN.match(cluster_url):
+        logger.warning(f"Malformed MongoDB Cluster URL: {masked_url}")
+        show_toast("⚠️ Invalid MongoDB Cluster URL")
+        return False
+
     try:
-        client = MongoClient(cluster_url, serverSelectionTimeoutMS=3000)
-        client.server_info()  # Test connection
+        client = get_mongodb_client(cluster_url)
+        await asyncio.to_thread(client.admin.command, "ping")  # Test connection
         logger.info(f"MongoDB URL validation successful: {masked_url}")
         show_toast(f"MongoDB URL validation successful: {masked_url}")
         return True
@@ -174,12 +240,20 @@ def validate_mongodb_url(cluster_url):
 
 
 # Function to validate Qdrant
-def validate_qdrant_url(qdrant_url, api_key):
+@cache_validation
+async def validate_qdrant_url(qdrant_url, api_key):
+    from qdrant_client.http import exceptions as qdrant_exceptions
+
     masked_url = mask_key(qdrant_url)
     masked_key = mask_key(api_key)
+    if not QDRANT_URL_PATTERN.match(qdrant_url):
+        logger.warning(f"Malformed Qdrant URL: {masked_url}")
+        show_toast("⚠️ Invalid Qdrant URL")
+        return False
+
     try:
-        client = QdrantClient(url=qdrant_url, api_key=api_key)
-        client.get_collections()  # Test connection
+        client = get_qdrant_client(qdrant_url, api_key)
+        await asyncio.to_thread(client.get_collections)  # Test connection
         logger.info(
             f"Qdrant validation successful: {masked_url} | API Key: {masked_key}"
         )
@@ -203,11 +277,13 @@ def validate_qdrant_url(qdrant_url, api_key):
 
 
 # Function to validate Server URL
-def validate_server_url(server_url):
+@cache_validation
+async def validate_server_url(server_url):
     masked_url = mask_key(server_url)
     try:
-        response = requests.get(f"{server_url}/")
-        if response.status_code == 200 and response.json()["success"] == True:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(f"{server_url}/healthz")
+        if response.status_code == 200 and response.json().get("success") is True:
             logger.info(f"Server URL validation successful: {masked_url}")
             show_toast(f"Server URL validation successful: {masked_url}")
             return True
@@ -220,11 +296,28 @@ def validate_server_url(server_url):
         return False
 
 
+# Function to validate all the environment keys concurrently
+async def validate_environment_keys(
+    gemini_api_key, mongodb_cluster_url, qdrant_url, qdrant_api_key, server_url
+):
+    validations = {
+        "Gemini API Key": validate_gemini_api_key(gemini_api_key),
+        "MongoDB Cluster URL": validate_mongodb_url(mongodb_cluster_url),
+        "Qdrant URL or API Key": validate_qdrant_url(qdrant_url, qdrant_api_key),
+    }
+    # Server URL is optional
+    if server_url:
+        validations["Server URL"] = validate_server_url(server_url)
+
+    results = await asyncio.gather(*validations.values(), return_exceptions=True)
+    return {name: result is True for name, result in zip(validations, results)}
+
+
 # Validation before storing the keys
 def check_gemini_api_key():
     gemini_api_key = st.session_state.get("input_gemini_api_key", "")
 
-    if validate_gemini_api_key(gemini_api_key):
+    if asyncio.run(validate_gemini_api_key(gemini_api_key)):
         st.session_state["gemini_api_key"] = gemini_api_key
     else:
         st.sidebar.error("❌ Invalid Gemini API Key!")
@@ -233,7 +326,7 @@ def check_gemini_api_key():
 def check_mongodb_cluster_url():
     mongodb_cluster_url = st.session_state.get("input_mongodb_cluster_url", "")
 
-    if validate_mongodb_url(mongodb_cluster_url):
+    if asyncio.run(validate_mongodb_url(mongodb_cluster_url)):
         st.session_state["mongodb_cluster_url"] = mongodb_cluster_url
     else:
         st.sidebar.error("❌ Invalid MongoDB Cluster URL!")
@@ -242,7 +335,7 @@ def check_mongodb_cluster_url():
 def check_qdrant_url_api_key():
     qdrant_url = st.session_state.get("input_qdrant_url", "")
     qdrant_api_key = st.session_state.get("input_qdrant_api_key", "")
-    if validate_qdrant_url(qdrant_url, qdrant_api_key):
+    if asyncio.run(validate_qdrant_url(qdrant_url, qdrant_api_key)):
         st.session_state["qdrant_url"] = qdrant_url
         st.session_state["qdrant_api_key"] = qdrant_api_key
     else:
@@ -252,7 +345,7 @@ def check_qdrant_url_api_key():
 def check_server_url():
     server_url = st.session_state.get("input_server_url", "")
 
-    if validate_server_url(server_url):
+    if asyncio.run(validate_server_url(server_url)):
         st.session_state["server_url"] = server_url
     else:
         st.sidebar.error("❌ Invalid Server URL!")
@@ -301,14 +394,17 @@ def add_env_keys():
         confirm = st.form_submit_button("Confirm", icon="✔️")
 
         if confirm:
-            is_validated = (
-                validate_gemini_api_key(form_gemini_api_key)
-                and validate_mongodb_url(form_mongodb_cluster_url)
-                and validate_qdrant_url(form_qdrant_url, form_qdrant_api_key)
-                and (validate_server_url(form_server_url) if form_server_url else True)
+            validation_results = asyncio.run(
+                validate_environment_keys(
+                    form_gemini_api_key,
+                    form_mongodb_cluster_url,
+                    form_qdrant_url,
+                    form_qdrant_api_key,
+                    form_server_url,
+                )
             )
 
-            if is_validated:
+            if all(validation_results.values()):
                 st.session_state["gemini_api_key"] = form_gemini_api_key
                 st.session_state["mongodb_cluster_url"] = form_mongodb_cluster_url
                 st.session_state["qdrant_url"] = form_qdrant_url
@@ -318,7 +414,10 @@ def add_env_keys():
                 show_toast("Environment Keys successfully loaded")
                 st.rerun()
             else:
-                st.error("Invalid keys provided. Please try again.")
+                invalid_keys = [
+                    name for name, is_valid in validation_results.items() if not is_valid
+                ]
+                st.error(f"Invalid {', '.join(invalid_keys)} provided. Please try again.")
 
 
 # Function to get persistent values
@@ -333,10 +432,12 @@ def clear_environment_keys():
     for key in ENVIRONMENT_KEYS.keys():
         st.session_state[key] = ""
 
+    st.session_state.pop("validation_cache", None)
+
 
 # Function to clear environment agents
 def clear_environment_agents():
-    for agent in ["fsa", "dssa", "sca", "scba"]:
+    for agent in AGENT_KEYS:
         del st.session_state[agent]
 
     for data in ["daily_stocks", "chatbot_interactions"]:
@@ -432,75 +533,56 @@ if not st.session_state.get("keys_provided", False):
         st.session_state["keys_provided"] = True
         st.rerun()
 else:
-    # Initialize Agents in session state
-    if (
-        "fsa" not in st.session_state
-        or "dssa" not in st.session_state
-        or "sca" not in st.session_state
-        or "scba" not in st.session_state
-    ):
-        logger.info("Agents Loaded")
-    if "fsa" not in st.session_state:
-        st.session_state.fsa = FindStockAgent(model=Gemini())
+    from phi.model.google import Gemini
+    from phi.embedder.google import GeminiEmbedder
 
-    if "dssa" not in st.session_state:
-        st.session_state.dssa = DailyStockSentimentAgent(
-            db_uri=st.session_state["mongodb_cluster_url"],
-            model=Gemini(),
-        )
-
-    if "sca" not in st.session_state:
-        st.session_state.sca = StockChartAgent(model=Gemini())
-
-    if "scba" not in st.session_state:
-        st.session_state.scba = StockChatbotAgent(
-            storage_db_uri=st.session_state["mongodb_cluster_url"],
-            qdrant_url=st.session_state["qdrant_url"],
-            api_key=st.session_state["qdrant_api_key"],
-            session_id="",
-            run_id="",
-            user_id="",
-            model=Gemini(),
-            embedder=GeminiEmbedder(),
-        )
-
-    # Initialize Agent Data in session state
-    if (
-        "daily_stocks" not in st.session_state
-        or "chatbot_interactions" not in st.session_state
-    ):
-        logger.info("Agent Data Loaded")
+    from modules.find_stock_agent import FindStockAgent
+    from modules.daily_stock_sentiment_agent import DailyStockSentimentAgent
+    from modules.stock_chart_agent import StockChartAgent
+    from modules.stock_chatbot_agent import StockChatbotAgent
 
-    if "daily_stocks" not in st.session_state:
-        st.session_state.daily_stocks = st.session_state.dssa.stocks
+    # Initialize Agents in session state
+    missing_agents = AGENT_KEYS - st.session_state.keys()
+    if missing_agents:
+        logger.info("Agents Loaded")
 
-    if "chatbot_interactions" not in st.session_state:
-        st.session_state.chatbot_interactions = []
+        if "fsa" in missing_agents:
+            st.session_state.fsa = FindStockAgent(model=Gemini())
 
-    # Helper Data
-    if (
-        "found_stocks" not in st.session_state
-        or "added_stocks" not in st.session_state
-        or "scheduler_state" not in st.session_state
-    ):
-        logger.info("Helper Data Loaded")
+        if "dssa" in missing_agents:
+            st.session_state.dssa = DailyStockSentimentAgent(
+                db_uri=st.session_state["mongodb_cluster_url"],
+                model=Gemini(),
+            )
 
-    if "found_stocks" not in st.session_state:
-        st.session_state.found_stocks = []
+        if "sca" in missing_agents:
+            st.session_state.sca = StockChartAgent(model=Gemini())
+
+        if "scba" in missing_agents:
+            st.session_state.scba = StockChatbotAgent(
+                storage_db_uri=st.session_state["mongodb_cluster_url"],
+                qdrant_url=st.session_state["qdrant_url"],
+                api_key=st.session_state["qdrant_api_key"],
+                session_id="",
+                run_id="",
+                user_id="",
+                model=Gemini(),
+                embedder=GeminiEmbedder(),
+            )
 
-    if "added_stocks" not in st.session_state:
-        st.session_state.added_stocks = []
+    # Initialize Agent Data and Helper Data in session state
+    st.session_state.setdefault("daily_stocks", st.session_state.dssa.stocks)
 
-    if "scheduler_state" not in st.session_state:
-        st.session_state.scheduler_state = 0
+    missing_data = SESSION_DEFAULTS.keys() - st.session_state.keys()
+    if missing_data:
+        logger.info(f"Session Data Loaded: {sorted(missing_data)}")
+        for key in missing_data:
+            st.session_state[key] = SESSION_DEFAULTS[key]()
 
 
 # Helper Functions
-if "show_toast" not in st.session_state:
-    st.session_state.show_toast = False
-
-if "toast_message" not in st.session_state:
-    st.session_state.toast_message = ""
+st.session_state.setdefault("show_toast", False)
+st.session_state.setdefault("toast_message", "")
 
 if st.session_state.show_toast:
     st.toast(st.session_state.toast_message)
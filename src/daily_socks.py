@@ -1,7 +1,13 @@
+import html
+import time
 import requests
 import logging
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from streamlit_components.st_horizontal import st_horizontal
 from streamlit_components.st_show_toast import show_toast
@@ -20,18 +26,101 @@ st.set_page_config(
 )
 
 # Scheduler state Mapping
-SCHEDULER_STATE = {
-    0: "Stopped",
-    1: "Running",
-    2: "Paused",
+SCHEDULER_STATE = ("Stopped", "Running", "Paused")
+
+# Seconds the quick analysis of the same daily stocks is reused for
+QUICK_ANALYSIS_TTL = 3600
+
+# Seconds to wait for the server to answer a scheduler action
+SCHEDULER_ACTION_TIMEOUT = 10
+
+# Scheduler actions sent in the background: action -> (endpoint, success, failure)
+SCHEDULER_ACTIONS = {
+    "start": (
+        "start_scheduler",
+        "Daily Socks Scheduler started successfully.",
+        "❌ Failed to start scheduler.",
+    ),
+    "stop": (
+        "stop_scheduler",
+        "Daily Socks Scheduler stopped successfully.",
+        "❌ Failed to stop scheduler.",
+    ),
+    "refresh": (
+        "refresh_scheduler",
+        "Daily Socks Scheduler is refreshing.",
+        "❌ Failed to refresh scheduler.",
+    ),
 }
 
 
+# Function to get a pooled HTTP session for the scheduler server
+@st.cache_resource(show_spinner=False)
+def get_http_session() -> requests.Session:
+    """
+    Creates the HTTP session shared by all calls to the scheduler server.
+
+    Keeping the session across reruns reuses its pooled connections, so calls skip
+    the TCP and TLS handshakes. Idempotent requests are retried with exponential
+    backoff on connection errors and on 502, 503 and 504 responses.
+
+    Returns:
+        requests.Session: The shared HTTP session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Function to find stocks for a query
+@st.cache_data(ttl=dt.timedelta(days=1), max_entries=100, show_spinner=False)
+def find_stocks(query: str) -> list[str]:
+    """
+    Finds the stock ticker symbols for the given query using the Find Stock Agent.
+
+    Results are cached per query, so repeated searches skip the agent and network calls.
+    The agent also returns no stocks when it fails, so empty results are raised instead
+    of cached, and the query is searched again next time.
+
+    Args:
+        query (str): The stock symbol or query to search for.
+
+    Returns:
+        list[str]: The stock ticker symbols found for the query.
+
+    Raises:
+        LookupError: If no stocks were found for the query.
+    """
+    logger.info("Finding stocks for query: %s", query)
+    stocks = st.session_state.fsa.find_stock(query)
+    if not stocks:
+        raise LookupError(f"No stocks found for query: {query}")
+    return stocks
+
+
 # Function to fetch scheduler status
-def get_scheduler_status():
+@st.cache_data(ttl=5, show_spinner=False)
+def get_scheduler_status(server_url: str):
     """
     Fetches the current status of the daily stock sentiment analysis scheduler.
 
+    The status is cached for 5 seconds per server, so reruns in quick succession
+    share one request. Scheduler actions clear the cache to show their effect.
+
+    Args:
+        server_url (str): The URL of the scheduler server.
+
     Returns a dictionary with one of the following structures:
 
     - If successful, returns a dictionary with the following keys:
@@ -45,7 +134,7 @@ def get_scheduler_status():
     """
     
     try:
-        response = requests.get(f"{st.session_state.server_url}/scheduler_status")
+        response = get_http_session().get(f"{server_url}/scheduler_status")
         if response.status_code == 200:
             return response.json()
         else:
@@ -55,9 +144,15 @@ def get_scheduler_status():
 
 
 # Function to get scheduler state
-def scheduler_state() -> int:
+def scheduler_state(scheduler_response: dict) -> int:
     """
-    Fetches the current state of the daily stock sentiment analysis scheduler.
+    Gets the current state of the daily stock sentiment analysis scheduler.
+
+    The state is read from the scheduler status response, which already carries it,
+    so the page needs a single request to the server for both.
+
+    Args:
+        scheduler_response (dict): The response of `get_scheduler_status`.
 
     Returns:
         int: The current state of the scheduler, which can be one of the following:
@@ -65,122 +160,137 @@ def scheduler_state() -> int:
             - 1: Running
             - 2: Paused
         If the request fails or an error occurs, it defaults to returning 0.
-
-    Exceptions:
-        If a network-related error occurs during the request, returns a dictionary
-        with an "error" key containing the error message.
     """
 
-    try:
-        response = requests.get(f"{st.session_state.server_url}/scheduler_state")
-        if response.status_code == 200:
-            if response.json()["success"] == True:
-                state = response.json()["state"]
-                show_toast(f"Scheduler is currently in {SCHEDULER_STATE[state]} state")
-                return state
-            else:
-                return 0
-        else:
-            return 0
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    status = scheduler_response.get("status")
+    if scheduler_response.get("success") == True and status:
+        return int(status["State"])
+    else:
+        return 0
 
 
 # Function to reload stocks
-def reload_stocks():
+def reload_stocks(server_url: str):
     """
     Reload stock symbols from MongoDB for the scheduler.
+
+    Args:
+        server_url (str): The URL of the scheduler server.
     """
     try:
-        response = requests.post(f"{st.session_state.server_url}/reload_stocks")
-        if response.status_code == 200 and response.json()["success"] == True:
-            logger.info("Successfully reloaded stocks for the scheduler.")
+        response = get_http_session().post(f"{server_url}/reload_stocks")
+        # The server reloads the stocks in the background and answers 202
+        if response.status_code in (200, 202) and response.json()["success"] == True:
+            logger.info("Successfully queued stock reload for the scheduler.")
         else:
             logger.error("Failed to reload stocks for the scheduler.")
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error while reloading stocks for the scheduler: {e}")
+        logger.error("Error while reloading stocks for the scheduler: %s", e)
 
 
-# Function to start scheduler
-def start_scheduler():
+# Function to get the executor sending scheduler actions in the background
+@st.cache_resource(show_spinner=False)
+def get_scheduler_executor() -> ThreadPoolExecutor:
     """
-    Start the daily stock sentiment analysis scheduler by sending a request
-    to the server.
+    Creates the thread pool shared by all sessions to send scheduler actions.
+
+    Returns:
+        ThreadPoolExecutor: The shared thread pool.
     """
-    try:
-        response = requests.post(f"{st.session_state.server_url}/start_scheduler")
-        if response.status_code == 200:
-            logger.info("Scheduler started successfully.")
-            show_toast("Daily Socks Scheduler started successfully.")
-            st.rerun()
-        else:
-            logger.error("Failed to start scheduler.")
-            show_toast("❌ Failed to start scheduler.")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error while starting stock scheduler: {e}")
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="scheduler-action")
 
 
-# Function to stop scheduler
-def stop_scheduler():
+# Function to send a scheduler action in the background
+def run_scheduler_action(server_url: str, action: str):
     """
-    Stop the daily stock sentiment analysis scheduler by sending a request
-    to the server.
+    Start, stop or refresh the daily stock sentiment analysis scheduler by sending
+    a request to the server in the background.
+
+    The page is not blocked while the server answers. The pending request is kept
+    in the session state and its response is handled by `watch_scheduler_action`.
+
+    Args:
+        server_url (str): The URL of the scheduler server.
+        action (str): "start", "stop" or "refresh", see SCHEDULER_ACTIONS.
     """
+    endpoint = SCHEDULER_ACTIONS[action][0]
+    if action == "refresh":
+        st.session_state["pause_scheduler"] = False
+
+    future = get_scheduler_executor().submit(
+        get_http_session().post,
+        f"{server_url}/{endpoint}",
+        timeout=SCHEDULER_ACTION_TIMEOUT,
+    )
+    st.session_state.pending_scheduler_action = (action, future)
+    logger.info("Sent request to %s scheduler.", action)
+
+
+# Function to wait for the pending scheduler action
+@st.fragment(run_every=0.5)
+def watch_scheduler_action():
+    """
+    Polls the pending scheduler action and reruns the page once its response
+    has arrived. Only this fragment reruns while the server answers.
+    """
+    action, future = st.session_state.pending_scheduler_action
+    if not future.done():
+        st.caption(f"⏳ Waiting for the scheduler to {action}...")
+        return
 
+    del st.session_state.pending_scheduler_action
+    _, success_message, failure_message = SCHEDULER_ACTIONS[action]
     try:
-        response = requests.post(f"{st.session_state.server_url}/stop_scheduler")
-        if response.status_code == 200:
-            logger.info("Scheduler stopped successfully.")
-            show_toast("Daily Socks Scheduler stopped successfully.")
-            st.rerun()
+        response = future.result()
+        # The server refreshes the scheduler in the background and answers 202
+        if response.status_code in (200, 202):
+            get_scheduler_status.clear()
+            logger.info("Scheduler %s succeeded.", action)
+            show_toast(success_message)
         else:
-            logger.error("Failed to stop scheduler.")
-            show_toast("❌ Failed to stop scheduler.")
+            logger.error("Failed to %s scheduler.", action)
+            show_toast(failure_message)
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error while stopping stock scheduler: {e}")
+        logger.error("Error while trying to %s stock scheduler: %s", action, e)
+        show_toast(failure_message)
+    st.rerun()
 
 
 # Function to toggle scheduler
-def toggle_scheduler():
+def toggle_scheduler(server_url: str):
     """
     Toggle the state of the daily stock sentiment analysis scheduler by
     sending a request to the server.
+
+    Args:
+        server_url (str): The URL of the scheduler server.
     """
 
     try:
-        response = requests.post(f"{st.session_state.server_url}/toggle_scheduler")
+        response = get_http_session().post(f"{server_url}/toggle_scheduler")
         if response.status_code == 200:
+            get_scheduler_status.clear()
             status_message = response.json()["message"]
-            logger.info(f"Scheduler toggled successfully. {status_message}")
+            logger.info("Scheduler toggled successfully. %s", status_message)
             show_toast(status_message)
         else:
-            error_message = response.json()["error"]
-            logger.error(f"Failed to toggle scheduler: {error_message}")
+            error_message = "Failed to toggle scheduler."
+            # Scheduler errors are wrapped in the "detail" of the HTTPException, while
+            # FastAPI's own errors have a string "detail" and proxies may not send JSON
+            try:
+                error_response = response.json()
+            except ValueError:
+                error_response = None
+            if isinstance(error_response, dict):
+                detail = error_response.get("detail")
+                if isinstance(detail, dict):
+                    error_message = detail.get("error", error_message)
+                elif isinstance(detail, str):
+                    error_message = detail
+            logger.error("Failed to toggle scheduler: %s", error_message)
             show_toast(error_message)
-            logger.error(f"Failed to toggle scheduler: {error_message}")
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error while toggling stock scheduler: {e}")
-
-
-# Function to refresh scheduler
-def refresh_scheduler():
-    """
-    Refresh the daily stock sentiment analysis scheduler completely.
-    """
-
-    try:
-        response = requests.post(f"{st.session_state.server_url}/refresh_scheduler")
-        if response.status_code == 200:
-            logger.info("Scheduler refreshed successfully.")
-            st.session_state["pause_scheduler"] = False
-            logger.info("Scheduler refreshed successfully.")
-            show_toast("Daily Socks Scheduler refreshed successfully.")
-            st.rerun()
-        else:
-            logger.error("Failed to refresh scheduler.")
-            show_toast("❌ Failed to refresh scheduler.")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error while refreshing stock scheduler: {e}")
+        logger.error("Error while toggling stock scheduler: %s", e)
 
 
 @st.dialog("Quick Analysis")
@@ -196,16 +306,28 @@ def quick_analysis():
         st.rerun()
 
     try:
-        logger.info("Generating Quick analysis...")
-        summaries = st.session_state.dssa.perform_quick_analysis()
-
         st.markdown("## 📊 Quick Analysis Summaries")
 
-        if not summaries:
-            st.info("No analysis results available.")
-            return
+        # Reuse the analysis of the same daily stocks within the session
+        stocks = tuple(sorted(st.session_state.dssa.stocks))
+        cached = st.session_state.get("quick_analysis_cache")
+        if (
+            cached
+            and cached["stocks"] == stocks
+            and time.monotonic() - cached["analyzed_at"] < QUICK_ANALYSIS_TTL
+        ):
+            logger.info("Using cached Quick analysis")
+            summaries = cached["summaries"]
+            analyzed_at = cached["analyzed_at"]
+        else:
+            logger.info("Generating Quick analysis...")
+            analyzed_at = time.monotonic()
+            # Each summary is shown as soon as its stock is analyzed
+            summaries = st.session_state.dssa.iter_quick_analysis()
 
+        shown_summaries = []
         for summary in summaries:
+            shown_summaries.append(summary)
             with st.container():
                 # Extract stock details from the summary (assuming summary is a dict)
                 symbol = summary.get("symbol", "N/A")
@@ -221,10 +343,20 @@ def quick_analysis():
                 # Optional: Use an Expander for a cleaner look
                 with st.expander("🔍 Detailed Analysis"):
                     st.write(summary_text)
+
+        if not shown_summaries:
+            st.info("No analysis results available.")
+            return
+
+        st.session_state.quick_analysis_cache = {
+            "stocks": stocks,
+            "analyzed_at": analyzed_at,
+            "summaries": shown_summaries,
+        }
         logger.info("Generated Quick analysis for all daily stocks")
 
     except Exception as e:
-        logger.error(f"Error while performing quick analysis: {e}")
+        logger.error("Error while performing quick analysis: %s", e)
 
 
 @st.dialog("Add Daily Stocks")
@@ -235,7 +367,10 @@ def add_daily_stock():
     try:
         query = st.text_input("Enter a stock symbol or query:")
         if st.button("Find Stocks", key="find_daily_stocks"):
-            st.session_state.found_stocks = st.session_state.fsa.find_stock(query)
+            try:
+                st.session_state.found_stocks = find_stocks(query.strip())
+            except LookupError:
+                st.session_state.found_stocks = []
             st.session_state.added_stocks = []
             if not st.session_state.found_stocks:
                 show_toast("No stocks found. Please try again.")
@@ -252,35 +387,41 @@ def add_daily_stock():
             )
             st.write("Click a stock to add/remove it.")
     except Exception as e:
-        logger.error(f"Error while loading dialog to add daily stocks: {e}")
+        logger.error("Error while loading dialog to add daily stocks: %s", e)
 
     try:
         st.write("Double Click `Select All` to choose all.")
         with st_horizontal():
             if st.button("Confirm & Add", key="confirm_daily_stocks"):
+                daily_stocks = set(st.session_state.daily_stocks)
                 final_stocks = [
-                    stock
-                    for stock in stocks_to_add
-                    if stock not in st.session_state.daily_stocks
+                    stock for stock in stocks_to_add if stock not in daily_stocks
                 ]
-                st.session_state.daily_stocks.extend(final_stocks)
-                st.session_state.dssa.add_stocks(final_stocks)
                 st.session_state.found_stocks = []
                 st.session_state.added_stocks = []
 
-                if st.session_state.server_url == "":
+                # Skip the database write and the scheduler reload if nothing changed
+                if not final_stocks:
+                    show_toast("Selected stocks are already Daily stocks")
+                    st.rerun()
+
+                st.session_state.daily_stocks.extend(final_stocks)
+                st.session_state.dssa.add_stocks(final_stocks)
+
+                server_url = st.session_state.server_url
+                if server_url == "":
                     logger.warning(
                         "Server URL is not set. Daily stocks will not reloaded."
                     )
                 else:
                     # Reload the stocks for the scheduler
-                    reload_stocks()
+                    reload_stocks(server_url)
 
                     show_toast("Successfully Added Daily stocks from Database")
                     st.rerun()
 
-            if st.button("Select All", key="select_all_daily_stocks"):
-                st.session_state.added_stocks = st.session_state.found_stocks
+            if st.button("Select All", key="select_all_add_daily_stocks"):
+                st.session_state.added_stocks = list(st.session_state.found_stocks)
     except Exception as e:
         logger.error("Error while adding daily stocks.")
 
@@ -292,7 +433,7 @@ def remove_daily_stock():
     """
     try:
         st.markdown("### Select Stocks to Remove:")
-        st.session_state.found_stocks = st.session_state.daily_stocks
+        st.session_state.found_stocks = list(st.session_state.daily_stocks)
 
         if st.session_state.found_stocks:
             stocks_to_remove = st.pills(
@@ -305,34 +446,42 @@ def remove_daily_stock():
             )
             st.write("Click a stock to add/remove it.")
     except Exception as e:
-        logger.error(f"Error while loading dialog to remove daily stocks: {e}")
+        logger.error("Error while loading dialog to remove daily stocks: %s", e)
 
     try:
         st.write("Double Click `Select All` to choose all.")
         with st_horizontal():
             if st.button("Confirm & Remove", key="confirm_remove_daily"):
+                st.session_state.found_stocks = []
+                st.session_state.added_stocks = []
+
+                # Skip the database write and the scheduler reload if nothing changed
+                if not stocks_to_remove:
+                    show_toast("No stocks selected to remove")
+                    st.rerun()
+
+                removed_stocks = set(stocks_to_remove)
                 st.session_state.daily_stocks = [
                     stock
                     for stock in st.session_state.daily_stocks
-                    if stock not in stocks_to_remove
+                    if stock not in removed_stocks
                 ]
                 st.session_state.dssa.remove_stocks(stocks_to_remove)
-                st.session_state.found_stocks = []
-                st.session_state.added_stocks = []
 
-                if st.session_state.server_url == "":
+                server_url = st.session_state.server_url
+                if server_url == "":
                     logger.warning(
                         "Server URL is not set. Daily stocks will not reloaded."
                     )
                 else:
                     # Reload the stocks for the scheduler
-                    reload_stocks()
+                    reload_stocks(server_url)
 
                     show_toast("Successfully Removed Daily stocks from Database")
                     st.rerun()
 
-            if st.button("Select All", key="select_all_daily_stocks"):
-                st.session_state.added_stocks = st.session_state.found_stocks
+            if st.button("Select All", key="select_all_remove_daily_stocks"):
+                st.session_state.added_stocks = list(st.session_state.found_stocks)
     except Exception as e:
         logger.error("Error while removing daily stocks.")
 
@@ -343,10 +492,14 @@ st.title("Daily Socks & Socks Training")
 # Daily Stocks Section
 with st.container(border=True):
     st.markdown("### Stocks with Daily Socks Sentiment Analysis")
-    with st_horizontal():
-        for stock in st.session_state.daily_stocks:
-            with st.container(border=True):
-                st.markdown(f"**{stock}**")
+    # One markdown element for all the stocks (styled in assets/custom.css)
+    stock_chips = "".join(
+        f'<span class="daily-stock-chip">{html.escape(stock)}</span>'
+        for stock in st.session_state.daily_stocks
+    )
+    st.markdown(
+        f'<div class="daily-stock-chips">{stock_chips}</div>', unsafe_allow_html=True
+    )
 
     with st_horizontal():
         st.button("Add more Stocks", on_click=add_daily_stock, key="add_daily_stocks")
@@ -365,13 +518,20 @@ with st.container(border=True):
 with st.container(border=True):
     scheduler_section_height = 300
     st.markdown("### Daily Stocks Analysis Scheduler")
-    if st.session_state.server_url == "":
+    server_url = st.session_state.server_url
+    if server_url == "":
         st.warning(
             "You are not connected to a server. Please provide the server URL in the sidebar to use the scheduler.",
             icon="⚠️",
         )
         logger.warning("Server URL is not set. Daily stocks will not be scheduled.")
     else:
+        # Fetch the scheduler status once for the whole section
+        scheduler_response = get_scheduler_status(server_url)
+        current_scheduler_state = scheduler_state(scheduler_response)
+        # The scheduler actions wait until the pending one has been answered
+        scheduler_busy = "pending_scheduler_action" in st.session_state
+
         scheduler_buttons, scheduler_divider, scheduler_status = st.columns([1, 0.1, 3])
 
         with scheduler_buttons.container(height=scheduler_section_height, border=False):
@@ -379,51 +539,59 @@ with st.container(border=True):
                 "Start Daily Socks Scheduler",
                 key="start_daily_socks_scheduler",
                 use_container_width=True,
-                on_click=start_scheduler,
+                on_click=run_scheduler_action,
+                args=(server_url, "start"),
+                disabled=scheduler_busy,
             )
             st.button(
                 "Stop Daily Socks Scheduler",
                 key="stop_daily_socks_scheduler",
                 use_container_width=True,
                 type="primary",
-                on_click=stop_scheduler,
+                on_click=run_scheduler_action,
+                args=(server_url, "stop"),
+                disabled=scheduler_busy,
             )
 
             st.button(
                 "Refresh Scheduler",
                 key="refresh_scheduler",
                 use_container_width=True,
-                on_click=refresh_scheduler,
+                on_click=run_scheduler_action,
+                args=(server_url, "refresh"),
+                disabled=scheduler_busy,
             )
 
             st.toggle(
                 "Pause Scheduler",
                 key="pause_scheduler",
                 on_change=toggle_scheduler,
-                disabled=scheduler_state() == 0,
+                args=(server_url,),
+                disabled=current_scheduler_state == 0,
             )
 
+            if scheduler_busy:
+                watch_scheduler_action()
+
         with scheduler_divider.container(border=False):
             st_vertical_divider(scheduler_section_height)
 
         with scheduler_status.container(height=scheduler_section_height, border=False):
-            scheduler_response = get_scheduler_status()
             if "error" in scheduler_response:
-                st.error(scheduler_status["error"])
+                st.error(scheduler_response["error"])
                 logger.error(
-                    f"Failed to get scheduler status. {scheduler_response["error"]}"
+                    "Failed to get scheduler status. %s", scheduler_response["error"]
                 )
             else:
                 scheduler_status_response = scheduler_response["status"]
-                scheduler_state_reponse = int(scheduler_status_response["State"])
+                scheduler_state_label = SCHEDULER_STATE[current_scheduler_state]
 
-                if scheduler_state_reponse == 1:
-                    st.write("##### Scheduler Status:")
-                    st.success(
-                        f"✅ Scheduler is {SCHEDULER_STATE[scheduler_state_reponse]}."
-                    )
+                st.write("##### Scheduler Status:")
+                if current_scheduler_state == 1:
+                    st.success(f"✅ Scheduler is {scheduler_state_label}.")
                     logger.info(
-                        f"Scheduler is running. Scheduler Jobs: {scheduler_status_response["Jobs"]}"
+                        "Scheduler is running. Scheduler Jobs: %s",
+                        scheduler_status_response["Jobs"],
                     )
                     with st.expander("Show Scheduler Details"):
                         for job, details in scheduler_status_response["Jobs"].items():
@@ -432,8 +600,5 @@ with st.container(border=True):
                             else:
                                 st.success(f"**{job}** - Running | Next Run: {details}")
                 else:
-                    st.write("##### Scheduler Status:")
-                    st.warning(
-                        f"🚫 Scheduler is {SCHEDULER_STATE[scheduler_state_reponse]}. No active jobs."
-                    )
-                    logger.info(f"Scheduler is not running.")
+                    st.warning(f"🚫 Scheduler is {scheduler_state_label}. No active jobs.")
+                    logger.info("Scheduler is not running.")
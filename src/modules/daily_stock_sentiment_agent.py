@@ -1,6 +1,8 @@
+import os
 import logging
 import datetime as dt
-from typing import List
+from typing import Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from pymongo import MongoClient
 
@@ -14,6 +16,9 @@ from .models.models import QuickAnalysisModel
 # Configure logging
 logger = logging.getLogger("app")
 
+# Number of stocks analysed concurrently (keep low for rate limited API keys)
+QUICK_ANALYSIS_WORKERS = int(os.environ.get("QUICK_ANALYSIS_WORKERS", 8))
+
 
 class DailyStockSentimentAgent:
     """
@@ -170,27 +175,70 @@ class DailyStockSentimentAgent:
         except Exception as e:
             logger.error(f"Error while removing stocks from MongoDB: {e}")
 
+    def quick_analyze_stock(self, stock: str) -> Optional[dict]:
+        """
+        Perform a quick analysis for a single stock.
+
+        Args:
+            stock (str): The stock ticker symbol to analyze.
+
+        Returns:
+            Optional[dict]: The quick analysis summary, or None if the analysis failed.
+        """
+        try:
+            # Each run works on its own copy as phi Agents keep per-run state
+            agent = self.quick_analysis_agent.deep_copy()
+            response = agent.run(f"Perform a quick analysis for the stock {stock}.")
+            logger.info(f"Quick analysis for {stock} completed")
+            return response.content.model_dump()
+        except Exception as e:
+            logger.error(f"Error during quick analysis for {stock}: {e}")
+            return None
+
     def perform_quick_analysis(self) -> List[dict]:
         """
         Perform a quick analysis for all monitored stocks.
 
+        The stocks are analyzed concurrently, bounded by `QUICK_ANALYSIS_WORKERS`.
+
         Returns:
             List[dict]: A list of quick analysis summaries for stocks.
         """
-        summaries = []
         if len(self.stocks) > 0:
-            for stock in self.stocks:
-                try:
-                    response = self.quick_analysis_agent.run(
-                        f"Perform a quick analysis for the stock {stock}."
-                    )
-                    summaries.append(response.content.dict())
-                    logger.info(f"Quick analysis for {stock} completed")
-                except Exception as e:
-                    logger.error(f"Error during quick analysis for {stock}: {e}")
+            max_workers = max(1, min(QUICK_ANALYSIS_WORKERS, len(self.stocks)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(self.quick_analyze_stock, self.stocks)
+                summaries = [summary for summary in results if summary is not None]
             logger.info(f"Completed Quick Analysis for '{self.stocks}'")
             return summaries
         else:
             logger.warning(
                 "No stocks found in Daily Stocks. Can't perform Quick Analysis"
             )
+
+    def iter_quick_analysis(self) -> Iterator[dict]:
+        """
+        Perform a quick analysis for all monitored stocks, yielding each summary
+        as soon as its stock is analyzed.
+
+        The stocks are analyzed concurrently, bounded by `QUICK_ANALYSIS_WORKERS`.
+
+        Yields:
+            dict: The quick analysis summary of a stock, in order of completion.
+        """
+        if len(self.stocks) > 0:
+            max_workers = max(1, min(QUICK_ANALYSIS_WORKERS, len(self.stocks)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self.quick_analyze_stock, stock)
+                    for stock in self.stocks
+                ]
+                for future in as_completed(futures):
+                    summary = future.result()
+                    if summary is not None:
+                        yield summary
+            logger.info(f"Completed Quick Analysis for '{self.stocks}'")
+        else:
+            logger.warning(
+                "No stocks found in Daily Stocks. Can't perform Quick Analysis"
+            )
@@ -110,11 +110,8 @@ class FindStockAgent:
             logger.info(f"Validating stock symbol: {symbol}")
             ticker = yf.Ticker(symbol)
             if ticker is not None:
-                return (
-                    True
-                    if "symbol" in ticker.info and ticker.info["symbol"] == symbol
-                    else False
-                )
+                ticker_info = ticker.info
+                return ticker_info.get("symbol") == symbol
             else:
                 logger.warning("Invalid stock symbol. Will run a Query...")
                 return False            
@@ -146,6 +143,8 @@ class FindStockAgent:
                     list_symbols = ast.literal_eval(
                         stock_symbols.strip().splitlines()[0]
                     )
+                    # Drop repeated symbols while keeping the agent's order
+                    list_symbols = list(dict.fromkeys(list_symbols))
                     logger.info(f"Found stock symbols: {list_symbols}")
                     return list_symbols
                 except (SyntaxError, ValueError) as e:
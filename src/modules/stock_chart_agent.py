@@ -143,8 +143,12 @@ class StockChartAgent:
         try:
             logger.info(f"Retrieving historical stock data for {self.stock_symbol}")
             stock = yf.Ticker(self.stock_symbol)
+            # Charts only need OHLCV, skip the dividend and split columns
             df = stock.history(
-                start=self.start_date, end=self.end_date, interval=self.interval
+                start=self.start_date,
+                end=self.end_date,
+                interval=self.interval,
+                actions=False,
             )
             logger.info(f"Retrieved {len(df)} records for {self.stock_symbol}")
             return df
@@ -161,13 +165,17 @@ class StockChartAgent:
                 return
             logger.info("Calculating data for indicators.")
             rolling_20 = self.df["Close"].rolling(window=20)
-            self.df["SMA_20"] = rolling_20.mean()
+            rolling_20_mean = rolling_20.mean()
+            rolling_20_std = rolling_20.std()
+            self.df["SMA_20"] = rolling_20_mean
             self.df["EMA_20"] = self.df["Close"].ewm(span=20, adjust=False).mean()
-            self.df["BB_20_Upper"] = rolling_20.mean() + 2 * rolling_20.std()
-            self.df["BB_20_Lower"] = rolling_20.mean() - 2 * rolling_20.std()
-            self.df["VWAP"] = (self.df["Close"] * self.df["Volume"]).cumsum() / self.df[
-                "Volume"
-            ].cumsum()
+            self.df["BB_20_Upper"] = rolling_20_mean + 2 * rolling_20_std
+            self.df["BB_20_Lower"] = rolling_20_mean - 2 * rolling_20_std
+            # Zero cumulative volume (e.g. indices) would divide by zero
+            cumulative_volume = self.df["Volume"].cumsum()
+            self.df["VWAP"] = (self.df["Close"] * self.df["Volume"]).cumsum() / (
+                cumulative_volume.where(cumulative_volume > 0)
+            )
             logger.info("Indicators data successfully fetched")
         except Exception as e:
             logger.error(f"Error while adding indicators: {e}")
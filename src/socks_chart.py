@@ -58,6 +58,29 @@ def plot_chart(
         return go.Figure()
 
 
+@st.cache_data(ttl=dt.timedelta(minutes=15), max_entries=100, show_spinner=False)
+def is_valid_stock(symbol: str) -> bool:
+    """
+    Checks if the given stock symbol is valid using the Find Stock Agent.
+
+    Only definite answers are cached. The agent returns None when the check itself
+    fails, which is raised instead, so the symbol is checked again next time.
+
+    Args:
+        symbol (str): The stock ticker symbol (e.g., "AAPL").
+
+    Returns:
+        bool: True if the stock symbol is valid, False otherwise.
+
+    Raises:
+        LookupError: If the stock symbol could not be checked.
+    """
+    is_valid = st.session_state.fsa.is_valid_stock(symbol)
+    if is_valid is None:
+        raise LookupError(f"Could not check the stock symbol: {symbol}")
+    return is_valid
+
+
 def both_interval_selected(time_period):
     """
     Checks if the given time_period is a tuple of two dates.
@@ -164,7 +187,9 @@ with st.container(border=True):
                 indicators=indicators,
             )
             st.markdown(f"### Stock Chart for {symbol}")
-            fig = st.plotly_chart(chart, use_container_width=True)
+            fig = st.plotly_chart(
+                chart, use_container_width=True, key=f"stock-chart-{symbol}"
+            )
         else:
             st.markdown(f"### Stock Chart for {symbol}")
             st.area_chart()
@@ -177,7 +202,12 @@ with st.container(border=True):
     with st.container():
         with st_horizontal():
             if st.button("Plot", icon="📈"):
-                if st.session_state.fsa.is_valid_stock(symbol):
+                try:
+                    symbol_is_valid = is_valid_stock(symbol)
+                except LookupError:
+                    symbol_is_valid = False
+
+                if symbol_is_valid:
                     logger.info(
                         f"Valid stock symbol detected: {symbol}. Proceeding to plot."
                     )
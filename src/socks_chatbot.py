@@ -22,7 +22,7 @@ st.set_page_config(
 st.markdown(
     """
     <style>
-        .st-emotion-cache-janbn0 {
+        div[data-testid="stChatMessage"]:has(div[data-testid="stChatMessageAvatarUser"]) {
             flex-direction: row-reverse;
             text-align: right;
         }
@@ -136,26 +136,36 @@ def add_knowledge():
             logger.error("Failed to load knowledge from local PDF")
             st.error("Failed to upload file, please try again!", icon="⚠️")
 
-st.title("SocksAI Chatbot")
 
-# Display conversation history
-for message in st.session_state["chatbot_interactions"]:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+@st.fragment
+def chat_panel():
+    """
+    Renders the conversation and the chat input.
+
+    Runs as a fragment, so sending a message reruns only the chat and not the whole page.
+    """
+    # Display conversation history
+    for message in st.session_state["chatbot_interactions"]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
-if prompt := st.chat_input(placeholder="Talk to SocksAI...", disabled=st.session_state.get("chat_input_disabled", False)):
+    if prompt := st.chat_input(placeholder="Talk to SocksAI...", disabled=st.session_state.get("chat_input_disabled", False)):
 
-    with st.chat_message("user"):
-        st.markdown(prompt)
+        with st.chat_message("user"):
+            st.markdown(prompt)
 
-    st.session_state["chatbot_interactions"].append({"role": "user", "content": prompt})
+        st.session_state["chatbot_interactions"].append({"role": "user", "content": prompt})
 
-    with st.spinner("Thinking..."):
-        with st.chat_message("assistant"):
-            response = st.session_state.scba.chat(prompt)
-            full_response = st.write_stream(response)
+        with st.spinner("Thinking..."):
+            with st.chat_message("assistant"):
+                response = st.session_state.scba.chat(prompt)
+                full_response = st.write_stream(response)
 
-    st.session_state["chatbot_interactions"].append({"role": "assistant", "content": full_response})
+        st.session_state["chatbot_interactions"].append({"role": "assistant", "content": full_response})
+
+
+st.title("SocksAI Chatbot")
 
+chat_panel()
 
 st.button("Add Knowledge", on_click=add_knowledge, key="add_knowledge")
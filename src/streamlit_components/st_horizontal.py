@@ -35,6 +35,16 @@ HORIZONTAL_STYLE = """
 """
 
 
+def st_horizontal_style():
+    """
+    Adds the `HORIZONTAL_STYLE` to the Streamlit app.
+
+    The style applies to every `st_horizontal()` container of the page, so it only
+    needs to be added once per run, instead of once per container.
+    """
+    st.markdown(HORIZONTAL_STYLE, unsafe_allow_html=True)
+
+
 @contextmanager
 def st_horizontal():
     """
@@ -57,11 +67,10 @@ def st_horizontal():
     Style
     -----
     The horizontal alignment is achieved by adding a custom CSS style to the Streamlit app.
-    The style is defined in the `HORIZONTAL_STYLE` variable above. If you want to override
-    the default style, you can define your own CSS in a `<style>` block and add it to your
-    Streamlit app before calling `st_horizontal()`.
+    The style is defined in the `HORIZONTAL_STYLE` variable above, and is added once per run
+    with `st_horizontal_style()`. If you want to override the default style, you can define
+    your own CSS in a `<style>` block and add it to your Streamlit app.
     """
-    st.markdown(HORIZONTAL_STYLE, unsafe_allow_html=True)
     with st.container():
         st.markdown(
             '<span class="hide-element horizontal-marker"></span>',